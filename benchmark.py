@@ -0,0 +1,205 @@
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from nslkdd_loader import load_pipeline_module
+
+
+PROTOCOLS = ['tcp', 'udp', 'icmp']
+SERVICES = ['http', 'private', 'domain_u', 'smtp', 'ftp_data', 'ecr_i', 'eco_i', 'other', 'telnet', 'finger']
+FLAGS = ['SF', 'S0', 'REJ', 'RSTR', 'RSTO', 'SH', 'S1']
+ATTACKS = ['normal', 'neptune', 'smurf', 'satan', 'ipsweep', 'portsweep', 'nmap', 'back',
+           'guess_passwd', 'warezclient', 'teardrop', 'buffer_overflow']
+
+
+def synthetic_chunk(processor, rows, rng):
+    # NSL-KDD-shaped rows: column kinds follow the processor's loading schema
+    schema = processor.build_dtype_schema()
+    columns = {}
+    for name in processor.feature_names:
+        kind = schema[name]
+        if name == 'protocol_type':
+            columns[name] = rng.choice(PROTOCOLS, rows, p=[0.82, 0.12, 0.06])
+        elif name == 'service':
+            columns[name] = rng.choice(SERVICES, rows)
+        elif name == 'flag':
+            columns[name] = rng.choice(FLAGS, rows, p=[0.6, 0.2, 0.1, 0.04, 0.03, 0.02, 0.01])
+        elif name == 'attack_type':
+            continue
+        elif kind == 'uint8':
+            columns[name] = (rng.random(rows) < 0.3).astype(np.uint8)
+        elif kind == 'float32':
+            columns[name] = np.round(rng.random(rows), 2)
+        elif name in ('src_bytes', 'dst_bytes'):
+            sizes = rng.lognormal(6.0, 2.5, rows).astype(np.int64)
+            columns[name] = np.where(rng.random(rows) < 0.35, 0, sizes)
+        elif name == 'duration':
+            columns[name] = np.where(rng.random(rows) < 0.9, 0, rng.integers(0, 40000, rows))
+        elif name in ('count', 'srv_count'):
+            columns[name] = rng.integers(0, 512, rows)
+        elif name in ('dst_host_count', 'dst_host_srv_count'):
+            columns[name] = rng.integers(0, 256, rows)
+        elif name == 'difficulty_level':
+            columns[name] = rng.integers(0, 22, rows)
+        else:
+            columns[name] = np.where(rng.random(rows) < 0.95, 0, rng.integers(0, 5, rows))
+
+    # Tie the labels loosely to the features so the classifiers have signal to find
+    attack = rng.choice(ATTACKS[1:], rows)
+    label = np.where(rng.random(rows) < 0.55, 'normal', attack)
+    label = np.where(columns['flag'] == 'S0', 'neptune', label)
+    label = np.where((columns['protocol_type'] == 'icmp') & (rng.random(rows) < 0.8), 'smurf', label)
+    columns['attack_type'] = label
+    return pd.DataFrame(columns, columns=processor.feature_names)
+
+
+def write_synthetic_nslkdd(path, rows, seed=0, chunk_rows=200000):
+    processor = load_pipeline_module().SimpleNSLKDDProcessor()
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', newline='') as file:
+        for start in range(0, rows, chunk_rows):
+            chunk = synthetic_chunk(processor, min(chunk_rows, rows - start), rng)
+            chunk.to_csv(file, header=False, index=False)
+    return path
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return peak / 1024
+
+
+def timed(results, stage, rows, function):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = function()
+    seconds = time.perf_counter() - start
+    results[stage] = {
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    return value
+
+
+def benchmark_file(path):
+    # Runs in a fresh process per dataset size so peak RSS is not shared between sizes
+    pipeline = load_pipeline_module()
+    processor = pipeline.SimpleNSLKDDProcessor()
+    processor.verbose = False
+    results = {}
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not processor.step1_load_real_csv(path, use_cache=False):
+            raise RuntimeError(f"could not load {path}")
+    seconds = time.perf_counter() - start
+    rows = len(processor.data)
+    results['step1_load'] = {
+        'seconds': seconds,
+        'rows_per_second': rows / seconds,
+        'peak_rss_mb': peak_rss_mb(),
+        'memory_mb': processor.load_stats['memory_bytes'] / 1024 ** 2,
+        'engine': processor.load_stats['engine'],
+    }
+
+    timed(results, 'step3_extract_values', rows, processor.step3_extract_values)
+    # Step 5 also trains the histogram trees, so it gets its own name instead of being compared
+    # with older step5_rule_classifier timings; rule_scoring times the rule cascade alone
+    timed(results, 'step5_rules_and_tree', rows, processor.step5_input_based_prediction)
+    classifier = timed(results, 'step6_linear_classifier', rows, processor.step6_simple_linear_classifier)
+    timed(results, 'rule_scoring', rows,
+          lambda: pipeline.rule_classifier_predict_batch(processor.data))
+    timed(results, 'linear_scoring', rows, lambda: classifier.predict_batch(processor.data))
+    return {'rows': rows, 'stages': results}
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit or None,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare_results(baseline, current):
+    print("\nComparison against baseline (seconds, ratio > 1 means slower):")
+    for size, result in current['sizes'].items():
+        if size not in baseline.get('sizes', {}):
+            continue
+        old_stages = baseline['sizes'][size]['stages']
+        for stage, timing in result['stages'].items():
+            if stage in old_stages and old_stages[stage]['seconds'] > 0:
+                ratio = timing['seconds'] / old_stages[stage]['seconds']
+                print(f"  {size} rows {stage}: {old_stages[stage]['seconds']:.4f} -> "
+                      f"{timing['seconds']:.4f} ({ratio:.2f}x)")
+
+
+def parse_sizes(value):
+    return [int(float(size)) for size in value.split(',') if size.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the NSL-KDD pipeline on synthetic data")
+    parser.add_argument('--sizes', type=parse_sizes, default=[10000, 1000000, 10000000],
+                        help="comma-separated row counts, e.g. 10000,1e6,1e7")
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'nslkdd_bench'),
+                        help="where synthetic CSV files are written and reused")
+    parser.add_argument('--output', default='bench_results.json', help="JSON results file")
+    parser.add_argument('--compare', help="earlier results JSON to compare against")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    report = {'environment': environment_info(), 'sizes': {}}
+    for rows in args.sizes:
+        path = os.path.join(args.workdir, f"synthetic_{rows}_seed{args.seed}.csv")
+        if not os.path.exists(path):
+            print(f"Generating {rows} synthetic rows: {path}")
+            write_synthetic_nslkdd(path, rows, seed=args.seed)
+
+        print(f"Benchmarking {rows} rows...")
+        context = multiprocessing.get_context('spawn')
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(benchmark_file, path).result()
+        report['sizes'][str(rows)] = result
+        for stage, timing in result['stages'].items():
+            print(f"  {stage}: {timing['seconds']:.4f}s, {timing['rows_per_second']:,.0f} rows/s, "
+                  f"peak RSS {timing['peak_rss_mb']:.1f} MB")
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print("Results written to:", args.output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare_results(json.load(file), report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
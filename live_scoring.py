@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import collections
+import contextlib
+import csv
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from nslkdd_loader import load_pipeline_module
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LatencyTracker:
+    def __init__(self, window=10000):
+        # Only the most recent latencies are kept so memory stays bounded
+        self.samples = collections.deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        samples = list(self.samples)
+        p50 = percentile(samples, 0.50)
+        p99 = percentile(samples, 0.99)
+        return {
+            'records': self.count,
+            'p50_ms': p50 * 1000 if p50 is not None else None,
+            'p99_ms': p99 * 1000 if p99 is not None else None,
+        }
+
+
+class LiveScoringService:
+    def __init__(self, processor, rule_predict_batch, classifier, batch_size=256, max_delay=0.005,
+                 queue_size=10000):
+        self.feature_names = processor.feature_names
+        self.symbolic_features = processor.symbolic_features
+        self.rule_predict_batch = rule_predict_batch
+        self.classifier = classifier
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        # A bounded queue: when it is full, connection readers stop reading (backpressure)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.latency = LatencyTracker()
+        self.batches = 0
+
+    def parse_record(self, line):
+        line = line.strip()
+        if line.startswith('{'):
+            record = json.loads(line)
+            values = [record.get(name) for name in self.feature_names]
+        elif line.startswith('['):
+            values = json.loads(line)
+        else:
+            values = next(csv.reader([line]))
+        # Live records may come without the attack_type/difficulty_level labels
+        if len(values) not in (len(self.feature_names) - 2, len(self.feature_names) - 1,
+                               len(self.feature_names)):
+            raise ValueError(f"expected {len(self.feature_names) - 2} to {len(self.feature_names)} fields, "
+                             f"got {len(values)}")
+        values = list(values) + [None] * (len(self.feature_names) - len(values))
+        return values
+
+    def records_to_frame(self, records):
+        # Build the batch column by column; per-column pandas conversion dominates small batches
+        columns = {}
+        for name, values in zip(self.feature_names, zip(*records)):
+            if name in self.symbolic_features or name == 'difficulty_level':
+                columns[name] = np.array(values, dtype=object)
+            else:
+                try:
+                    columns[name] = np.array(values, dtype=np.float64)
+                except (TypeError, ValueError):
+                    columns[name] = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(np.float64)
+        return pd.DataFrame(columns, copy=False)
+
+    def score_batch(self, records):
+        data = self.records_to_frame(records)
+        rule = self.rule_predict_batch(data)
+        linear, scores = self.classifier.predict_batch(data)
+        # NaN is not valid JSON, so records with missing features report a null score
+        scores = [float(score) if np.isfinite(score) else None for score in scores]
+        return [{'rule': str(rule[i]), 'linear': str(linear[i]), 'score': scores[i]}
+                for i in range(len(records))]
+
+    async def next_batch(self):
+        # Wait for one record, then fill the batch until it is full or the deadline passes
+        items = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+        while len(items) < self.batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    async def batcher(self):
+        while True:
+            items = await self.next_batch()
+            try:
+                verdicts = self.score_batch([record for record, future, received in items])
+            except Exception as e:
+                verdicts = [{'error': str(e)}] * len(items)
+            now = time.perf_counter()
+            for (record, future, received), verdict in zip(items, verdicts):
+                self.latency.add(now - received)
+                if not future.done():
+                    future.set_result(verdict)
+            self.batches += 1
+
+    async def write_verdicts(self, writer, pending):
+        # Verdicts go back in the order the records arrived on this connection
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            record_id, future = item
+            verdict = dict(await future)
+            verdict['id'] = record_id
+            writer.write((json.dumps(verdict) + "\n").encode())
+            await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(maxsize=self.queue.maxsize)
+        writer_task = asyncio.create_task(self.write_verdicts(writer, pending))
+        record_id = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                text = line.decode().strip()
+                if not text:
+                    continue
+                if text == 'STATS':
+                    future = loop.create_future()
+                    future.set_result(self.stats())
+                    await pending.put((None, future))
+                    continue
+                record_id += 1
+                future = loop.create_future()
+                try:
+                    record = self.parse_record(text)
+                except ValueError as e:
+                    future.set_result({'error': str(e)})
+                else:
+                    await self.queue.put((record, future, time.perf_counter()))
+                await pending.put((record_id, future))
+        finally:
+            await pending.put(None)
+            await writer_task
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    def stats(self):
+        summary = self.latency.summary()
+        summary['batches'] = self.batches
+        summary['queued'] = self.queue.qsize()
+        return summary
+
+    async def report_stats(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            summary = self.stats()
+            if summary['records']:
+                print(f"records={summary['records']} batches={summary['batches']} queued={summary['queued']} "
+                      f"p50={summary['p50_ms']:.2f}ms p99={summary['p99_ms']:.2f}ms", flush=True)
+
+    async def serve(self, host='127.0.0.1', port=9999, unix_path=None, stats_interval=10.0):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+            print("Live scoring service listening on", unix_path, flush=True)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print(f"Live scoring service listening on {host}:{port}", flush=True)
+        tasks = [asyncio.create_task(self.batcher())]
+        if stats_interval:
+            tasks.append(asyncio.create_task(self.report_stats(stats_interval)))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def run_load_generator(data_path, records, host='127.0.0.1', port=9999, unix_path=None, window=2000):
+    with open(data_path) as file:
+        lines = [line.strip() for line in file if line.strip()]
+    if not lines:
+        raise ValueError(f"no records in {data_path}")
+
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    # The window caps records in flight so the client measures latency, not its own queueing
+    in_flight = asyncio.Semaphore(window)
+    sent_at = {}
+    latencies = []
+    verdicts = collections.Counter()
+
+    async def send():
+        for i in range(records):
+            await in_flight.acquire()
+            sent_at[i + 1] = time.perf_counter()
+            writer.write((lines[i % len(lines)] + "\n").encode())
+            if i % 256 == 255:
+                await writer.drain()
+        await writer.drain()
+
+    async def receive():
+        for _ in range(records):
+            try:
+                line = await reader.readline()
+            except ConnectionError:
+                break
+            if not line:
+                break
+            verdict = json.loads(line)
+            latencies.append(time.perf_counter() - sent_at.pop(verdict['id']))
+            verdicts['error' if 'error' in verdict else verdict['linear']] += 1
+            in_flight.release()
+
+    start = time.perf_counter()
+    sender = asyncio.ensure_future(send())
+    await receive()
+    # If the server closed the connection early, the sender may be waiting for a free slot
+    sender.cancel()
+    with contextlib.suppress(asyncio.CancelledError, ConnectionError):
+        await sender
+    elapsed = time.perf_counter() - start
+    writer.close()
+    with contextlib.suppress(ConnectionError):
+        await writer.wait_closed()
+
+    def milliseconds(fraction):
+        value = percentile(latencies, fraction)
+        return None if value is None else value * 1000
+
+    result = {
+        'records': len(latencies),
+        'seconds': elapsed,
+        'records_per_second': len(latencies) / elapsed if latencies and elapsed > 0 else None,
+        'p50_ms': milliseconds(0.50),
+        'p99_ms': milliseconds(0.99),
+        'verdicts': dict(verdicts),
+    }
+    if not latencies:
+        print(f"No verdicts received for {records} records in {elapsed:.2f}s")
+    else:
+        print(f"Sent {result['records']} records in {elapsed:.2f}s: {result['records_per_second']:,.0f} records/s, "
+              f"p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms")
+    return result
+
+
+def build_service(args):
+    pipeline = load_pipeline_module()
+    processor = pipeline.SimpleNSLKDDProcessor()
+    classifier = pipeline.SimpleLinearClassifier()
+    if args.train:
+        processor.verbose = False
+        with contextlib.redirect_stdout(io.StringIO()):
+            loaded = processor.step1_load_real_csv(args.train)
+        if not loaded:
+            raise SystemExit(f"Could not load training data: {args.train}")
+        processor.train_linear_classifier(classifier)
+    return LiveScoringService(processor, pipeline.rule_classifier_predict_batch, classifier,
+                              batch_size=args.batch_size,
+                              max_delay=args.max_delay_ms / 1000, queue_size=args.queue_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live NSL-KDD connection record scoring")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="run the scoring service")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=9999)
+    serve.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    serve.add_argument('--train', help="train the linear classifier on this CSV before serving")
+    serve.add_argument('--batch-size', type=int, default=256)
+    serve.add_argument('--max-delay-ms', type=float, default=5.0,
+                       help="longest a record waits for its micro-batch to fill")
+    serve.add_argument('--queue-size', type=int, default=10000)
+    serve.add_argument('--stats-interval', type=float, default=10.0)
+
+    load = commands.add_parser('load', help="send records from a CSV file and measure throughput")
+    load.add_argument('--data', required=True, help="NSL-KDD CSV file to replay")
+    load.add_argument('--records', type=int, default=100000)
+    load.add_argument('--host', default='127.0.0.1')
+    load.add_argument('--port', type=int, default=9999)
+    load.add_argument('--unix')
+    load.add_argument('--window', type=int, default=2000, help="maximum records in flight")
+    load.add_argument('--output', help="write the load test results as JSON to this file")
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        service = build_service(args)
+        try:
+            asyncio.run(service.serve(args.host, args.port, args.unix, args.stats_interval))
+        except KeyboardInterrupt:
+            print("Final stats:", json.dumps(service.stats()))
+    else:
+        result = asyncio.run(run_load_generator(args.data, args.records, args.host, args.port,
+                                                args.unix, args.window))
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
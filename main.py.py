@@ -1,34 +1,1328 @@
+import numpy as np
 import pandas as pd
+from nslkdd_eval import ConfusionMatrix
+from nslkdd_features import FEATURE_NAMES, FeatureEncoder
+from nslkdd_index import GroupIndex
+from nslkdd_models import (HistogramTreeClassifier, SimpleLinearClassifier, binarize_attack_type,
+                           binary_target, rule_classifier_predict_batch, threshold_sweep)
+from nslkdd_stats import DatasetStatistics
+from nslkdd_store import RecordStore
+import argparse
+import concurrent.futures
 import csv
+import io
+import functools
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+def current_rss_bytes():
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # No /proc (e.g. macOS): fall back to the peak resident size
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageMetrics:
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = True
+        self.stages = {}
+    
+    def enable(self, trace_memory=True):
+        self.enabled = True
+        self.trace_memory = trace_memory
+    
+    def disable(self):
+        self.enabled = False
+    
+    def record(self, stage, wall_seconds, cpu_seconds, peak_traced_bytes, rss_delta_bytes, rows):
+        # Repeated runs of a stage accumulate; peaks keep the maximum
+        entry = self.stages.setdefault(stage, {
+            'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+            'peak_traced_bytes': 0, 'rss_delta_bytes': 0, 'rows': 0,
+        })
+        entry['calls'] += 1
+        entry['wall_seconds'] += wall_seconds
+        entry['cpu_seconds'] += cpu_seconds
+        entry['peak_traced_bytes'] = max(entry['peak_traced_bytes'], peak_traced_bytes)
+        entry['rss_delta_bytes'] += rss_delta_bytes
+        entry['rows'] += rows
+    
+    def to_dict(self):
+        return {stage: dict(entry) for stage, entry in self.stages.items()}
+    
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
+    
+    def to_prometheus(self, prefix='nslkdd_stage'):
+        descriptions = [
+            ('calls', 'counter', 'Number of times the stage ran'),
+            ('wall_seconds', 'counter', 'Wall-clock time spent in the stage'),
+            ('cpu_seconds', 'counter', 'Process CPU time spent in the stage'),
+            ('peak_traced_bytes', 'gauge', 'Peak tracemalloc-traced memory during the stage'),
+            ('rss_delta_bytes', 'gauge', 'Change in resident set size across the stage'),
+            ('rows', 'counter', 'Rows processed by the stage'),
+        ]
+        lines = []
+        for field, kind, help_text in descriptions:
+            name = f"{prefix}_{field}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, entry in self.stages.items():
+                lines.append(f'{name}{{stage="{stage}"}} {entry[field]}')
+        return "\n".join(lines) + "\n"
+
+
+def instrumented_step(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if not metrics.enabled:
+            return method(self, *args, **kwargs)
+        
+        started_tracing = False
+        if metrics.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        rows_before = self.rows_processed
+        rss_before = current_rss_bytes()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            wall_seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.process_time() - cpu_start
+            peak_traced = tracemalloc.get_traced_memory()[1] if metrics.trace_memory else 0
+            if started_tracing:
+                tracemalloc.stop()
+            metrics.record(method.__name__, wall_seconds, cpu_seconds, peak_traced,
+                           current_rss_bytes() - rss_before, self.rows_processed - rows_before)
+    return wrapper
+
+
+def resolve_sources(paths, extensions=('.csv', '.txt')):
+    # A file, a glob pattern or a directory (its .csv/.txt files), or a list of those.
+    # Matches are sorted per entry so daily captures load in date order; repeats are dropped.
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    sources = []
+    for path in map(os.fspath, paths):
+        if RecordStore.is_store(path):
+            matches = [path]
+        elif os.path.isdir(path):
+            matches = sorted(os.path.join(path, name) for name in os.listdir(path)
+                             if name.lower().endswith(extensions) and os.path.isfile(os.path.join(path, name)))
+        elif glob.has_magic(path):
+            matches = sorted(match for match in glob.glob(path) if os.path.isfile(match))
+        else:
+            matches = [path]
+        sources.extend(match for match in matches if match not in sources)
+    return sources
+
+
+def filter_mask(data, filters):
+    # Rows matching every filter; filters map a column to one value or a list of values
+    # (numbers for numeric columns, see SimpleNSLKDDProcessor.parse_filter_values)
+    mask = np.ones(len(data), dtype=bool)
+    for name, values in filters.items():
+        values = [values] if isinstance(values, str) else list(values)
+        column = data[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Compares category codes, not strings
+            mask &= column.isin(values).to_numpy()
+        else:
+            # Compared in the column's own dtype (float32 rates, downcast counters); values the
+            # column cannot hold exactly, such as 300 in a uint8 column, cannot match
+            values = np.asarray(values)
+            converted = values.astype(column.dtype)
+            mask &= np.isin(np.asarray(column), converted[converted == values])
+    return mask
+
+
+def store_frame(store, start=0, stop=None, columns=None):
+    # Committed rows of a record store as a DataFrame over the memory-mapped column files
+    columns_wanted = store.columns if columns is None else [name for name in store.columns if name in columns]
+    columns = {}
+    for name in columns_wanted:
+        values = store.column(name, start, stop)
+        if store.is_categorical(name):
+            columns[name] = pd.Categorical.from_codes(values, categories=store.categories(name))
+        else:
+            columns[name] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def source_size(path):
+    return RecordStore.open(path).nbytes() if RecordStore.is_store(path) else os.path.getsize(path)
+
+
+def source_shards(path, count):
+    # Byte ranges of a CSV file, or row ranges of a record store
+    if RecordStore.is_store(path):
+        rows = RecordStore.open(path).rows
+        bounds = sorted({rows * i // count for i in range(count + 1)})
+        return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+    return byte_range_shards(path, count)
+
+
+def byte_range_shards(path, count):
+    # Split a CSV file into byte ranges that each start at the beginning of a line
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as file:
+        for i in range(1, count):
+            target = size * i // count
+            if target <= bounds[-1]:
+                continue
+            file.seek(target - 1)
+            file.readline()
+            position = file.tell()
+            if bounds[-1] < position < size:
+                bounds.append(position)
+    bounds.append(size)
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i] < bounds[i + 1]]
+
+
+def iter_shard_blocks(path, start, end, block_size=32 * 1024 * 1024):
+    # Shards can be large, so read them in line-aligned blocks
+    with open(path, 'rb') as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            block = file.read(min(block_size, end - position))
+            position += len(block)
+            if position < end:
+                rest = file.readline()
+                block += rest
+                position += len(rest)
+            yield block
+
+
+class BottomKReservoir:
+    # Bottom-k sampling: every item gets a uniform random key and the `size` smallest keys win,
+    # which is a uniform sample without replacement whatever order the items arrive in.
+    # Subclasses keep the items themselves next to the keys and their arrival positions.
+    def __init__(self, size):
+        self.size = size
+        self.keys = np.zeros(0)
+        self.positions = np.zeros(0, dtype=np.int64)
+        # Keys at or above the size-th smallest seen so far can never be sampled
+        self.limit = np.inf
+    
+    def admit(self, keys, positions):
+        # Indices of the offered items that can still be sampled; their keys are kept
+        keep = np.flatnonzero(keys < self.limit)
+        if len(keep):
+            self.keys = np.concatenate([self.keys, keys[keep]])
+            self.positions = np.concatenate([self.positions, positions[keep]])
+        return keep
+    
+    def trim(self):
+        # Called once the items are stored; trimming only at twice the size keeps rebuilds rare
+        if len(self.keys) >= 2 * self.size:
+            self.take(np.argpartition(self.keys, self.size - 1)[:self.size])
+            self.limit = self.keys.max()
+    
+    def take(self, chosen):
+        self.keys = self.keys[chosen]
+        self.positions = self.positions[chosen]
+    
+    def smallest_keys(self, count):
+        # The `count` lowest keys of a bottom-k sample are themselves a uniform sample
+        return np.argsort(self.keys, kind='stable')[:count]
+
+
+class LineReservoir(BottomKReservoir):
+    def __init__(self, size):
+        super().__init__(size)
+        self.lines = []
+    
+    def offer(self, keys, positions, block, starts, ends):
+        # Once the reservoir is full almost every line fails the key test, so only a
+        # handful per block are ever sliced out of the raw bytes
+        keep = self.admit(keys, positions)
+        if not len(keep):
+            return
+        self.lines.extend(block[start:end] for start, end in zip(starts[keep], ends[keep]))
+        self.trim()
+    
+    def take(self, chosen):
+        super().take(chosen)
+        self.lines = [self.lines[i] for i in chosen]
+    
+    def smallest(self, count):
+        chosen = self.smallest_keys(count)
+        return self.positions[chosen], [self.lines[i] for i in chosen]
+
+
+class RowReservoir(BottomKReservoir):
+    # Rows of a feature matrix that arrives chunk by chunk, with their labels; memory stays
+    # bounded by twice the sample size whatever the number of rows
+    def __init__(self, size, seed=0):
+        super().__init__(size)
+        self.rng = np.random.default_rng(seed)
+        self.seen = 0
+        self.rows = []
+        self.labels = []
+    
+    def offer(self, matrix, labels):
+        keep = self.admit(self.rng.random(len(matrix)), self.seen + np.arange(len(matrix)))
+        self.seen += len(matrix)
+        if not len(keep):
+            return
+        # Chunks are stored as they come and only joined when the reservoir is trimmed
+        self.rows.append(matrix[keep])
+        self.labels.append(np.asarray(labels)[keep])
+        self.trim()
+    
+    def take(self, chosen):
+        super().take(chosen)
+        self.rows = [np.concatenate(self.rows)[chosen]]
+        self.labels = [np.concatenate(self.labels)[chosen]]
+    
+    def sample(self):
+        # The sampled rows and labels back in arrival order
+        chosen = self.smallest_keys(self.size)
+        chosen = chosen[np.argsort(self.positions[chosen], kind='stable')]
+        return np.concatenate(self.rows)[chosen], np.concatenate(self.labels)[chosen]
+
+
+def previous_commas(data, positions, starts):
+    # Walks every line's cursor left until it sits on a comma; labels are short, so this takes
+    # a few dozen vectorized steps per block instead of a scan for every comma in it.
+    # Lines that run out of characters end up before their start.
+    positions = positions.copy()
+    active = np.flatnonzero(positions >= starts)
+    while len(active):
+        active = active[data[positions[active]] != ord(',')]
+        positions[active] -= 1
+        active = active[positions[active] >= starts[active]]
+    return positions
+
+
+def label_keys(data, starts, ends, fields_after):
+    # The label is the field `fields_after` fields from the end of each line. Its length, first
+    # 8 and last 8 bytes are packed into one uint64 key, so np.unique groups a block's labels.
+    high = ends
+    for _ in range(fields_after):
+        high = previous_commas(data, high - 1, starts)
+    low = previous_commas(data, high - 1, starts) + 1
+    valid = np.flatnonzero((high >= starts) & (low > starts))
+    low, high = low[valid], high[valid]
+    keys = (high - low).astype(np.uint64)
+    last = len(data) - 1
+    for base in (low, high - 8):
+        for offset in range(8):
+            position = base + offset
+            byte = data[np.clip(position, 0, last)].astype(np.uint64)
+            byte[(position < low) | (position >= high)] = 0
+            # Multiply-xorshift mixing; uint64 arithmetic wraps, which is what a hash wants
+            keys = (keys * np.uint64(0x100000001B3)) ^ byte
+            keys ^= keys >> np.uint64(29)
+    return keys, valid, low, high
+
+
+def allocate_sample(size, counts, allocation='proportional'):
+    # How many of `size` rows each stratum gets. proportional keeps the file's class mix
+    # (largest remainders, at least one row per class); equal gives rare classes the same share
+    strata = sorted(counts)
+    quotas = {stratum: 0 for stratum in strata}
+    remaining = min(size, sum(counts.values()))
+    if allocation == 'equal':
+        open_strata = [stratum for stratum in strata if counts[stratum] > 0]
+        while remaining and open_strata:
+            share = max(remaining // len(open_strata), 1)
+            for stratum in list(open_strata):
+                grant = min(share, counts[stratum] - quotas[stratum], remaining)
+                quotas[stratum] += grant
+                remaining -= grant
+                if quotas[stratum] == counts[stratum]:
+                    open_strata.remove(stratum)
+        return quotas
+    total = sum(counts.values())
+    exact = {stratum: remaining * counts[stratum] / total for stratum in strata}
+    for stratum in strata:
+        quotas[stratum] = min(counts[stratum], max(1, int(exact[stratum])))
+    leftover = remaining - sum(quotas.values())
+    by_remainder = sorted(strata, key=lambda stratum: (quotas[stratum] - exact[stratum], stratum))
+    for stratum in by_remainder:
+        if leftover <= 0:
+            break
+        if quotas[stratum] < counts[stratum]:
+            quotas[stratum] += 1
+            leftover -= 1
+    # At-least-one grants can overshoot when there are more classes than rows requested
+    for stratum in reversed(by_remainder):
+        if leftover >= 0:
+            break
+        if quotas[stratum] > 1:
+            quotas[stratum] -= 1
+            leftover += 1
+    return quotas
+
+
+def sample_csv_lines(path, size, fields_after_label=None, allocation='proportional', seed=0):
+    # One streaming pass over the raw bytes: a uniform sample of `size` lines, or with
+    # fields_after_label a stratified one (one reservoir per label, each capped at `size`).
+    # Memory stays bounded by the reservoirs whatever the file size.
+    rng = np.random.default_rng(seed)
+    reservoirs = {}
+    counts = {}
+    total = 0
+    for block in iter_shard_blocks(path, 0, os.path.getsize(path)):
+        data = np.frombuffer(block, dtype=np.uint8)
+        ends = np.flatnonzero(data == ord('\n'))
+        if len(data) and data[-1] != ord('\n'):
+            ends = np.append(ends, len(data))
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        # Blank lines (including a bare carriage return) are not records
+        present = ends - starts > 1
+        starts, ends = starts[present], ends[present]
+        positions = total + np.arange(len(starts))
+        total += len(starts)
+        keys = rng.random(len(starts))
+        if fields_after_label is None:
+            reservoirs.setdefault(None, LineReservoir(size)).offer(keys, positions, block, starts, ends + 1)
+            continue
+        labels, rows, low, high = label_keys(data, starts, ends, fields_after_label)
+        strata, first, inverse, sizes = np.unique(labels, return_index=True, return_inverse=True,
+                                                  return_counts=True)
+        # One stable sort groups the rows of every label
+        groups = np.split(rows[np.argsort(inverse.reshape(-1), kind='stable')], np.cumsum(sizes)[:-1])
+        for i, group in enumerate(groups):
+            name = block[low[first[i]]:high[first[i]]].decode()
+            counts[name] = counts.get(name, 0) + len(group)
+            reservoirs.setdefault(name, LineReservoir(size)).offer(
+                keys[group], positions[group], block, starts[group], ends[group] + 1)
+    
+    if fields_after_label is None:
+        counts = {None: total}
+        quotas = {None: min(size, total)}
+    else:
+        quotas = allocate_sample(size, counts, allocation)
+    chosen = [reservoirs[stratum].smallest(quota) for stratum, quota in quotas.items() if quota]
+    positions = np.concatenate([chosen_positions for chosen_positions, lines in chosen]) if chosen else np.zeros(0)
+    lines = [line for chosen_positions, chosen_lines in chosen for line in chosen_lines]
+    # Back in file order, every line newline-terminated so they can be joined and parsed
+    order = np.argsort(positions, kind='stable')
+    raw = b''.join(lines[i] if lines[i].endswith(b'\n') else lines[i] + b'\n' for i in order)
+    return raw, total, {stratum: quotas[stratum] for stratum in quotas}, counts
+
+
+# Per-process state for scoring workers, filled once by init_scoring_worker
+scoring_worker_state = {}
+
+
+def init_scoring_worker(classifier, feature_names, dtype_schema, statistics_config, columns=None, filters=None):
+    # columns and filters are the query step1 pushed into the loader; None reads every record in full
+    scoring_worker_state['classifier'] = classifier
+    scoring_worker_state['statistics_config'] = statistics_config
+    scoring_worker_state['feature_names'] = feature_names
+    scoring_worker_state['dtype_schema'] = dtype_schema
+    scoring_worker_state['columns'] = columns
+    scoring_worker_state['filters'] = filters
+
+
+def empty_score_tally():
+    return {
+        'rows': 0,
+        'rule': ConfusionMatrix(),
+        'linear': ConfusionMatrix(),
+        'statistics': None,
+    }
+
+
+def tally_scores(tally, data, classifier):
+    tally['rows'] += len(data)
+    tally['rule'].update(data['attack_type'], rule_classifier_predict_batch(data))
+    tally['linear'].update(data['attack_type'], classifier.predict_batch(data)[0])
+    return tally
+
+
+def iter_shard_frames(path, start, end, block_rows=1000000):
+    columns = scoring_worker_state['columns']
+    filters = scoring_worker_state['filters']
+    if RecordStore.is_store(path):
+        store = RecordStore.open(path)
+        frames = (store_frame(store, begin, min(begin + block_rows, end), columns)
+                  for begin in range(start, end, block_rows))
+    else:
+        schema = scoring_worker_state['dtype_schema']
+        if columns is not None:
+            schema = {name: schema[name] for name in columns}
+        frames = (pd.read_csv(io.BytesIO(block), names=scoring_worker_state['feature_names'], usecols=columns,
+                              dtype=schema, engine="c")
+                  for block in iter_shard_blocks(path, start, end))
+    for data in frames:
+        yield data[filter_mask(data, filters)].reset_index(drop=True) if filters else data
+
+
+def score_shard(path, start, end):
+    classifier = scoring_worker_state['classifier']
+    tally = empty_score_tally()
+    tally['statistics'] = DatasetStatistics(**scoring_worker_state['statistics_config'])
+    for data in iter_shard_frames(path, start, end):
+        tally_scores(tally, data, classifier)
+        tally['statistics'].update(data)
+    return tally
+
+
+def merge_score_tallies(tallies):
+    merged = empty_score_tally()
+    for tally in tallies:
+        merged['rows'] += tally['rows']
+        for name in ('rule', 'linear'):
+            merged[name].merge(tally[name])
+        if tally['statistics'] is not None:
+            if merged['statistics'] is None:
+                merged['statistics'] = tally['statistics']
+            else:
+                merged['statistics'].merge(tally['statistics'])
+    return merged
+
 
 class SimpleNSLKDDProcessor:
     def __init__(self):
         self.csv_filename = None
+        # Every file step1 loaded; several files get a source_file column
+        self.sources = []
         self.data = None
-        self.feature_names = [
-            'duration', 'protocol_type', 'service', 'flag', 'src_bytes', 'dst_bytes',
-            'land', 'wrong_fragment', 'urgent', 'hot', 'num_failed_logins', 'logged_in',
-            'num_compromised', 'root_shell', 'su_attempted', 'num_root', 'num_file_creations',
-            'num_shells', 'num_access_files', 'num_outbound_cmds', 'is_host_login',
-            'is_guest_login', 'count', 'srv_count', 'serror_rate', 'srv_serror_rate',
-            'rerror_rate', 'srv_rerror_rate', 'same_srv_rate', 'diff_srv_rate',
-            'srv_diff_host_rate', 'dst_host_count', 'dst_host_srv_count',
-            'dst_host_same_srv_rate', 'dst_host_diff_srv_rate', 'dst_host_same_src_port_rate',
-            'dst_host_srv_diff_host_rate', 'dst_host_serror_rate', 'dst_host_srv_serror_rate',
-            'dst_host_rerror_rate', 'dst_host_srv_rerror_rate', 'attack_type', 'difficulty_level'
-        ]
+        self.feature_names = list(FEATURE_NAMES)
+        # Column groups used to build the typed loading schema
+        self.symbolic_features = ['protocol_type', 'service', 'flag', 'attack_type']
+        self.binary_features = ['land', 'logged_in', 'is_host_login', 'is_guest_login']
+        self.load_stats = {}
+        # Set by step1 when the file is processed as a stream of chunks
+        self.chunksize = None
+        # Per-row console dumps are skipped when verbose is False
+        self.verbose = True
+        # Machine-readable step results (accuracies, timings) for the CLI
+        self.results = {}
+        # Opt-in per-step timing and memory instrumentation
+        self.metrics = StageMetrics()
+        self.rows_processed = 0
+        # Mergeable summary statistics, computed by step3 and updated incrementally
+        self.statistics = None
+        # Shared feature encoding: vocabularies plus the float32 matrix for in-memory data
+        self.encoder = None
+        self.encoded_matrix = None
+        self.active_cache_dir = None
+        # Row multiplicities when step1 deduplicated the data, otherwise None (every row counts once),
+        # and the distinct row each loaded record became
+        self.weights = None
+        self.record_rows = None
+        # Row offsets per category of the symbolic columns, for slicing in-memory data
+        self.groups = None
+        # Query pushed into step1: the columns to load (None for all) and row filters
+        self.projection = None
+        self.row_filters = None
+        # Histogram-trained tree model learned by step5, from at most this many rows when streaming
+        self.tree_classifier = None
+        self.tree_sample_rows = 250000
+        # False-positive budget step6 uses when it picks a threshold from the sweep
+        self.target_fpr = 0.01
         
-    def step1_load_real_csv(self, filename):
-        self.csv_filename = filename
+    # Columns each step reads. Step5's tree and step6's trained model learn from every loaded column.
+    STEP_COLUMNS = {
+        1: [],
+        2: [],
+        3: ['protocol_type', 'service', 'flag', 'attack_type', 'duration', 'src_bytes', 'dst_bytes',
+            'count', 'srv_count'],
+        4: ['attack_type'],
+        5: ['protocol_type', 'src_bytes', 'dst_bytes', 'service', 'attack_type'],
+        6: ['duration', 'src_bytes', 'dst_bytes', 'count', 'attack_type'],
+    }
+    
+    def required_columns(self, steps):
+        needed = set()
+        for step in steps:
+            needed.update(self.STEP_COLUMNS[step])
+        return [name for name in self.feature_names if name in needed]
+    
+    def loaded_columns(self):
+        # Every record column unless step1 was given a projection; filter columns and the label
+        # are always kept, since filtering and every evaluation need them
+        if self.projection is None:
+            return list(self.feature_names)
+        keep = set(self.projection) | set(self.row_filters or ()) | {'attack_type'}
+        return [name for name in self.feature_names if name in keep]
+    
+    def has_query(self):
+        return self.projection is not None or bool(self.row_filters)
+    
+    def parse_filter_values(self, filters):
+        # Filter values as the loader compares them: strings for symbolic columns, numbers of the
+        # column's schema type otherwise. Raises ValueError for values the column cannot hold.
+        schema = self.build_dtype_schema()
+        parsed = {}
+        for name, values in filters.items():
+            values = [values] if isinstance(values, str) or np.isscalar(values) else list(values)
+            if schema[name] == 'category':
+                parsed[name] = [str(value) for value in values]
+                continue
+            dtype = np.dtype(schema[name])
+            numbers = []
+            for value in values:
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{name} needs numeric filter values, got {value!r}")
+                if dtype.kind == 'f':
+                    numbers.append(float(dtype.type(number)))
+                elif number.is_integer() and np.iinfo(dtype).min <= number <= np.iinfo(dtype).max:
+                    numbers.append(int(number))
+                else:
+                    raise ValueError(f"{name} holds {dtype.name} values, got {value!r}")
+            parsed[name] = numbers
+        return parsed
+    
+    def query_matched_nothing(self):
+        # An empty result is reported by step1 rather than failing in a later step
+        if not self.row_filters:
+            return False
+        if self.data is not None:
+            empty = len(self.data) == 0
+        else:
+            # Streaming: scans only until the first matching row
+            empty = len(self.head(1)) == 0
+        if empty:
+            print("Error loading data: no records match the filters")
+            self.data = None
+            self.chunksize = None
+        return empty
+    
+    def apply_query(self, data):
+        # Projection and filters on a frame that is already columnar (cache, store, sample)
+        data = data[[name for name in self.loaded_columns() if name in data.columns]]
+        if self.row_filters:
+            data = data[filter_mask(data, self.row_filters)].reset_index(drop=True)
+        return data
+    
+    def build_dtype_schema(self):
+        schema = {}
+        for name in self.feature_names:
+            if name in self.symbolic_features:
+                schema[name] = 'category'
+            elif name in self.binary_features:
+                schema[name] = 'uint8'
+            elif name.endswith('_rate'):
+                schema[name] = 'float32'
+            else:
+                # Counters are parsed as int64 and downcast once the value range is known
+                schema[name] = 'int64'
+        return schema
+    
+    def csv_engine(self):
+        if importlib.util.find_spec("pyarrow") is not None:
+            return "pyarrow"
+        return "c"
+    
+    def downcast_counters(self, data):
+        schema = self.build_dtype_schema()
+        for name in data.columns:
+            if schema.get(name) == 'int64':
+                column = data[name]
+                if len(column) and column.min() >= 0:
+                    data[name] = pd.to_numeric(column, downcast='unsigned')
+                else:
+                    data[name] = pd.to_numeric(column, downcast='integer')
+        return data
+    
+    def iter_chunks(self, path, chunksize=100000):
+        if RecordStore.is_store(path):
+            # Row slices of the memory-mapped columns; nothing is parsed
+            store = RecordStore.open(path)
+            for start in range(0, store.rows, chunksize):
+                chunk = store_frame(store, start, start + chunksize, self.loaded_columns())
+                yield self.apply_query(chunk) if self.row_filters else chunk
+            return
+        # The pyarrow engine does not support chunked reading, so stream with the C parser.
+        # Only the loaded columns are parsed and filtered-out rows are dropped per chunk.
+        columns = self.loaded_columns()
+        schema = self.build_dtype_schema()
+        reader = pd.read_csv(path, names=self.feature_names, usecols=columns,
+                             dtype={name: schema[name] for name in columns}, engine="c", chunksize=chunksize)
+        with reader:
+            for chunk in reader:
+                if self.row_filters:
+                    chunk = chunk[filter_mask(chunk, self.row_filters)]
+                yield chunk
+    
+    def iter_data(self):
+        if self.data is not None:
+            self.rows_processed += len(self.data)
+            yield self.data
+        elif self.chunksize is not None:
+            # Several files are streamed one after another, each chunk tagged with its file
+            for number, path in enumerate(self.sources):
+                for chunk in self.iter_chunks(path, self.chunksize):
+                    if len(self.sources) > 1:
+                        chunk['source_file'] = pd.Categorical.from_codes(
+                            np.full(len(chunk), number, dtype=np.int32), categories=self.sources)
+                    self.rows_processed += len(chunk)
+                    yield chunk
+    
+    def iter_weighted(self):
+        # Chunks paired with their row weights; only deduplicated in-memory data has weights
+        for chunk in self.iter_data():
+            yield chunk, self.weights
+    
+    def has_data(self):
+        return self.data is not None or self.chunksize is not None
+    
+    def head(self, n=5):
+        if self.data is not None:
+            preview = self.data.head(n)
+        elif self.row_filters:
+            # The first matching rows may be anywhere in any of the files
+            chunks = (chunk for path in self.sources for chunk in self.iter_chunks(path, max(n, 100000)))
+            preview = next((chunk.head(n) for chunk in chunks if len(chunk)), None)
+            chunks.close()
+            if preview is None:
+                preview = pd.DataFrame(columns=self.loaded_columns())
+        elif RecordStore.is_store(self.csv_filename):
+            preview = store_frame(RecordStore.open(self.csv_filename), 0, n, self.loaded_columns())
+        else:
+            columns = self.loaded_columns()
+            schema = self.build_dtype_schema()
+            preview = pd.read_csv(self.csv_filename, names=self.feature_names, usecols=columns,
+                                  dtype={name: schema[name] for name in columns}, engine="c", nrows=n)
+        self.rows_processed += len(preview)
+        return preview
+    
+    def statistics_config(self):
+        schema = self.build_dtype_schema()
+        loaded = self.loaded_columns()
+        moment_columns = [name for name in loaded
+                          if schema[name] != 'category' and name != 'difficulty_level']
+        return {
+            'count_columns': [name for name in ['protocol_type', 'flag', 'attack_type'] if name in loaded],
+            'moment_columns': moment_columns,
+            'quantile_columns': [name for name in ['duration', 'src_bytes', 'dst_bytes'] if name in loaded],
+            'distinct_columns': [name for name in ['service'] if name in loaded],
+        }
+    
+    def new_statistics(self):
+        return DatasetStatistics(**self.statistics_config())
+    
+    def compute_statistics(self):
+        # Built once per load; later rows are folded in with update_statistics()
+        if self.statistics is None:
+            statistics = self.new_statistics()
+            for chunk, weights in self.iter_weighted():
+                statistics.update(chunk, weights)
+            self.statistics = statistics
+        return self.statistics
+    
+    def update_statistics(self, new_rows):
+        return self.compute_statistics().update(new_rows)
+    
+    def feature_encoder(self):
+        # Vocabularies are learned once per load and persisted next to the columnar cache
+        if self.encoder is None:
+            encoder_path = None
+            if self.active_cache_dir is not None:
+                encoder_path = os.path.join(self.active_cache_dir, 'encoder.json')
+            if encoder_path is not None and os.path.exists(encoder_path):
+                self.encoder = FeatureEncoder.load(encoder_path)
+            else:
+                self.encoder = FeatureEncoder(self.loaded_columns()).fit(self.iter_data())
+                if encoder_path is not None:
+                    self.encoder.save(encoder_path)
+        return self.encoder
+    
+    def group_index(self):
+        # Built once per load from the category codes; persisted next to the columnar cache
+        # when the data in memory is exactly what the cache holds
+        if self.data is None:
+            raise ValueError("the group index needs the data in memory (load without chunksize)")
+        if self.groups is None:
+            index_dir = None
+            if self.active_cache_dir is not None and self.weights is None:
+                index_dir = os.path.join(self.active_cache_dir, 'index')
+                self.groups = GroupIndex.load(index_dir, len(self.data))
+            if self.groups is None:
+                self.groups = GroupIndex().build(
+                    self.data, [name for name in self.symbolic_features if name in self.data.columns])
+                if index_dir is not None:
+                    self.groups.save(index_dir)
+        return self.groups
+    
+    def select(self, filters):
+        # filters maps a symbolic column to one value or a list of values, e.g.
+        # {'protocol_type': 'icmp', 'attack_type': ['smurf', 'pod']}
+        rows = self.group_index().select(filters)
+        return self.data.iloc[rows], None if self.weights is None else self.weights[rows]
+    
+    def slice_statistics(self, filters):
+        data, weights = self.select(filters)
+        return self.new_statistics().update(data, weights)
+    
+    def describe_slice(self, filters):
+        start = time.perf_counter()
+        statistics = self.slice_statistics(filters)
+        elapsed = time.perf_counter() - start
+        label = ", ".join(f"{name}={'|'.join(values) if isinstance(values, list) else values}"
+                          for name, values in filters.items())
+        print(f"Slice {label}: {statistics.rows} records ({elapsed * 1000:.1f} ms)")
+        for attack_type, count in statistics.sorted_counts('attack_type')[:10]:
+            print(f"  {attack_type}: {count}")
+        if statistics.rows:
+            moments = statistics.moments.summary()
+            for feature in ['duration', 'src_bytes', 'dst_bytes']:
+                print(f"  {feature}: mean={moments[feature]['mean']:.2f}, std={moments[feature]['std']:.2f}")
+        summary = statistics.summary()
+        summary['filters'] = filters
+        summary['seconds'] = elapsed
+        self.results.setdefault('slices', []).append(summary)
+        return statistics
+    
+    def encoded_features(self):
+        # One float32 matrix shared by every model and scoring pass over in-memory data
+        if self.encoded_matrix is None:
+            self.encoded_matrix = self.feature_encoder().transform(self.data)
+        return self.encoded_matrix
+    
+    def iter_encoded(self):
+        if self.data is not None:
+            yield self.data, self.encoded_features(), self.weights
+        else:
+            encoder = self.feature_encoder()
+            for chunk in self.iter_data():
+                yield chunk, encoder.transform(chunk), None
+    
+    def iter_inputs(self, encoded=False):
+        # (chunk, model input, row weights) triples; the input is the encoded matrix or the chunk itself
+        if encoded:
+            return self.iter_encoded()
+        return ((chunk, chunk, weights) for chunk, weights in self.iter_weighted())
+    
+    def reduce_confusion(self, predict_batch, encoded=False):
+        confusion = ConfusionMatrix()
+        for chunk, inputs, weights in self.iter_inputs(encoded):
+            confusion.update(chunk['attack_type'], predict_batch(inputs), weights)
+        return confusion
+    
+    def reduce_accuracy(self, predict_batch, encoded=False):
+        confusion = self.reduce_confusion(predict_batch, encoded)
+        return confusion.correct(), confusion.total()
+    
+    def print_evaluation(self, confusion, indent="  "):
+        binary = confusion.binary()
+        if binary['precision'] is not None and binary['recall'] is not None:
+            print(f"{indent}accuracy={confusion.accuracy():.4f} precision={binary['precision']:.4f} "
+                  f"recall={binary['recall']:.4f} F1={binary['f1']:.4f} "
+                  f"(tp={binary['tp']}, fp={binary['fp']}, tn={binary['tn']}, fn={binary['fn']})")
+        for family, counts in confusion.per_family().items():
+            kind = "false positives" if family == 'normal' else "detected"
+            print(f"{indent}{family}: {counts['flagged']}/{counts['records']} {kind} ({counts['rate']:.2%})")
+    
+    def train_linear_classifier(self, classifier, epochs=5, batch_size=256, lr=0.1):
+        start = time.perf_counter()
+        classifier.encoder = self.feature_encoder()
+        if self.data is not None:
+            classifier.fit(self.encoded_features(), self.encoder.encode_labels(self.data),
+                           epochs=epochs, batch_size=batch_size, lr=lr, weights=self.weights)
+        else:
+            # Streaming: one pass for the scaler, then each epoch sweeps the chunks once
+            classifier.fit_scaler(self.iter_data())
+            for epoch in range(epochs):
+                for chunk in self.iter_data():
+                    classifier.partial_fit(chunk, self.encoder.encode_labels(chunk),
+                                           epochs=1, batch_size=batch_size, lr=lr)
+        elapsed = time.perf_counter() - start
+        print(f"Trained on {len(classifier.feature_columns)} features in {elapsed:.2f}s")
+        print(f"  learned threshold: {classifier.threshold:.4f}")
+        return classifier
+    
+    def train_tree_classifier(self, classifier):
+        start = time.perf_counter()
+        # Same vocabularies as the shared encoder, but symbolic columns stay single integer codes
+        encoder = FeatureEncoder.from_dict(dict(self.feature_encoder().to_dict(), one_hot=False))
+        classifier.encoder = encoder
+        if self.data is not None:
+            classifier.fit(self.data, encoder.encode_labels(self.data), self.weights)
+        else:
+            # Streaming: the trees are learned from a uniform sample of the rows, so memory stays
+            # bounded and the bin edges see the whole capture, not just its first chunk
+            reservoir = RowReservoir(self.tree_sample_rows)
+            for chunk in self.iter_data():
+                reservoir.offer(encoder.transform(chunk), encoder.encode_labels(chunk))
+            matrix, labels = reservoir.sample()
+            if len(matrix) < reservoir.seen:
+                print(f"Training on a uniform sample of {len(matrix)} of {reservoir.seen} streamed records")
+            classifier.fit_binner(matrix)
+            classifier.fit_binned(classifier.bin(matrix), labels)
+        elapsed = time.perf_counter() - start
+        print(f"Trained {len(classifier.trees)} trees of depth <= {classifier.max_depth} in {elapsed:.2f}s")
+        return classifier
+    
+    def sweep_thresholds(self, classifier, max_fpr=None):
+        # One scoring pass over the data; only the scores and 0/1 targets are kept
+        scores = []
+        targets = []
+        row_weights = []
+        for chunk, inputs, weights in self.iter_inputs(encoded=classifier.coef is not None):
+            scores.append(classifier.score_batch(inputs))
+            targets.append(binary_target(chunk['attack_type']))
+            row_weights.append(np.ones(len(chunk)) if weights is None else weights)
+        if not scores:
+            return None
+        return threshold_sweep(np.concatenate(scores), np.concatenate(targets), max_fpr=max_fpr,
+                               weights=np.concatenate(row_weights))
+    
+    def parallel_score_file(self, path, classifier, workers=None, shards_per_worker=4):
+        # path may also be a list, glob or directory; shards are sized evenly across all files
+        workers = workers or os.cpu_count() or 1
+        paths = resolve_sources(path)
+        sizes = [source_size(source) for source in paths]
+        shard_size = max(sum(sizes) // (workers * shards_per_worker), 1)
+        shards = [(source, begin, end) for source, size in zip(paths, sizes)
+                  for begin, end in source_shards(source, max(round(size / shard_size), 1))]
+        # The query step1 was given applies here too; the rule classifier's columns are always read
+        columns = None
+        if self.projection is not None:
+            columns = [name for name in self.feature_names
+                       if name in set(self.loaded_columns()) | set(self.STEP_COLUMNS[5])]
+        worker_args = (classifier, self.feature_names, self.build_dtype_schema(),
+                       self.statistics_config(), columns, self.row_filters)
+        start = time.perf_counter()
+        if workers == 1:
+            init_scoring_worker(*worker_args)
+            tallies = [score_shard(source, begin, end) for source, begin, end in shards]
+        else:
+            # The classifier is pickled once per worker through the initializer, not per shard
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_scoring_worker,
+                                                        initargs=worker_args) as executor:
+                futures = [executor.submit(score_shard, source, begin, end) for source, begin, end in shards]
+                tallies = [future.result() for future in futures]
+        merged = merge_score_tallies(tallies)
+        elapsed = time.perf_counter() - start
+        
+        files = f" of {len(paths)} files" if len(paths) > 1 else ""
+        print(f"Scored {merged['rows']} records from {len(shards)} shards{files} on {workers} workers "
+              f"in {elapsed:.2f}s")
+        for name in ('rule', 'linear'):
+            if merged['rows']:
+                print(f"  {name} classifier:")
+                self.print_evaluation(merged[name], indent="    ")
+            merged[name] = merged[name].summary()
+        merged['seconds'] = elapsed
+        merged['workers'] = workers
+        if merged['statistics'] is not None:
+            merged['statistics'] = merged['statistics'].summary()
+        self.results['parallel_scoring'] = merged
+        return merged
+    
+    def cache_dir_for(self, filename):
+        return filename + ".cache"
+    
+    def source_fingerprint(self, filename):
+        # Path, size and mtime catch ordinary edits; the sampled content hash catches
+        # rewrites that keep the size and restore the timestamp
+        stat = os.stat(filename)
+        digest = hashlib.blake2b(digest_size=16)
+        block = 1024 * 1024
+        with open(filename, 'rb') as file:
+            digest.update(file.read(block))
+            if stat.st_size > block:
+                file.seek(max(stat.st_size - block, block))
+                digest.update(file.read(block))
+        return {
+            'path': os.path.abspath(filename),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': digest.hexdigest(),
+        }
+    
+    def write_cache(self, filename, data=None):
+        data = self.data if data is None else data
+        cache_dir = self.cache_dir_for(filename)
+        os.makedirs(cache_dir, exist_ok=True)
+        meta_path = os.path.join(cache_dir, 'meta.json')
+        # Invalidate first so a half-written bundle (or a stale encoder) is never read back
+        stale_files = (meta_path, os.path.join(cache_dir, 'encoder.json'),
+                       os.path.join(cache_dir, 'index', 'index.json'))
+        for stale in stale_files:
+            if os.path.exists(stale):
+                os.remove(stale)
+        
+        columns = {}
+        for name in data.columns:
+            column = data[name]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(cache_dir, name + '.npy'), column.cat.codes.to_numpy())
+                columns[name] = {'kind': 'category', 'categories': [str(c) for c in column.cat.categories]}
+            else:
+                np.save(os.path.join(cache_dir, name + '.npy'), column.to_numpy())
+                columns[name] = {'kind': 'numeric'}
+        
+        meta = {
+            'version': 1,
+            'source': self.source_fingerprint(filename),
+            'rows': len(data),
+            'columns': columns,
+        }
+        with open(meta_path, 'w') as file:
+            json.dump(meta, file)
+        return cache_dir
+    
+    def load_cache(self, filename, columns=None):
+        meta_path = os.path.join(self.cache_dir_for(filename), 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as file:
+            meta = json.load(file)
+        if meta.get('version') != 1 or meta['source'] != self.source_fingerprint(filename):
+            return None
+        
+        # Numeric columns stay memory-mapped; pandas wraps them without copying.
+        # With a projection only those column files are opened.
+        wanted = columns
+        columns = {}
+        for name, info in meta['columns'].items():
+            if wanted is not None and name not in wanted:
+                continue
+            values = np.load(os.path.join(self.cache_dir_for(filename), name + '.npy'), mmap_mode='r')
+            if info['kind'] == 'category':
+                columns[name] = pd.Categorical.from_codes(values, categories=info['categories'])
+            else:
+                columns[name] = values
+        return pd.DataFrame(columns, copy=False)
+    
+    def row_hashes(self, data):
+        # One vectorized 64-bit hash per record. Categorical columns hash their categories once
+        # and gather by code. The label is part of the row, so rows that differ only in
+        # attack_type or difficulty_level stay separate; the source_file tag is not.
+        return pd.util.hash_pandas_object(data[self.loaded_columns()], index=False).to_numpy()
+    
+    def deduplicate(self):
+        # Keep the first copy of every distinct record, in file order, plus how often it occurred
+        start = time.perf_counter()
+        records = len(self.data)
+        hashes = self.row_hashes(self.data)
+        unique, first, inverse, counts = np.unique(hashes, return_index=True, return_inverse=True,
+                                                   return_counts=True)
+        order = np.argsort(first, kind='stable')
+        self.data = self.data.iloc[first[order]].reset_index(drop=True)
+        self.weights = counts[order].astype(np.int64)
+        # Distinct row of every loaded record, so the records can be rebuilt in file order
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        self.record_rows = position[inverse.reshape(-1)]
+        self.encoded_matrix = None
+        self.groups = None
+        elapsed = time.perf_counter() - start
+        self.load_stats.update({
+            'records': records,
+            'distinct_records': len(self.data),
+            'dedup_seconds': elapsed,
+        })
+        print(f"Deduplicated {records} records to {len(self.data)} distinct rows "
+              f"({1 - len(self.data) / records if records else 0:.1%} duplicates) in {elapsed:.3f}s")
+        return self.weights
+    
+    def append_to_store(self, directory):
+        # Appends every loaded record to a record store, creating it on first use. Streamed data
+        # goes in chunk by chunk; deduplicated data is expanded back to every record in file order.
+        store = RecordStore.open(directory, self.build_dtype_schema())
+        start = time.perf_counter()
+        before = store.rows
+        for chunk, weights in self.iter_weighted():
+            if weights is not None:
+                chunk = chunk.iloc[self.record_rows]
+            store.append(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"Appended {store.rows - before} records to {directory} in {elapsed:.2f}s "
+              f"({store.rows} records, {store.nbytes() / 1024 ** 2:.1f} MB)")
+        self.results['store'] = {'path': directory, 'appended': store.rows - before, 'rows': store.rows,
+                                 'seconds': elapsed}
+        return store
+    
+    def parse_file(self, path, use_cache=True):
+        # One file as a typed frame: its own columnar cache when valid, otherwise a parse that
+        # then writes that cache. Safe to run on several files from a thread pool.
+        # With a projection or filters (see apply_query) the cache is read but never written.
+        if RecordStore.is_store(path):
+            return self.apply_query(store_frame(RecordStore.open(path), columns=self.loaded_columns())), "store"
+        data = self.load_cache(path, self.loaded_columns()) if use_cache else None
+        if data is not None:
+            return self.apply_query(data), "cache"
+        if self.has_query():
+            return self.read_csv_query(path), "c"
+        engine = self.csv_engine()
+        data = pd.read_csv(path, names=self.feature_names, dtype=self.build_dtype_schema(), engine=engine)
+        data = self.downcast_counters(data)
+        if use_cache:
+            try:
+                self.write_cache(path, data)
+            except OSError:
+                # A read-only capture directory only means the next load parses again
+                pass
+        return data, engine
+    
+    def read_csv_query(self, path, chunksize=1000000):
+        # Only the loaded columns are parsed and filtered-out rows are dropped chunk by chunk,
+        # so memory holds the matching rows. This is the C parser: pandas' pyarrow engine
+        # mishandles usecols together with names.
+        return self.downcast_counters(self.combine_frames(list(self.iter_chunks(path, chunksize))))
+    
+    def combine_frames(self, frames, sources=None):
+        # One pre-allocated buffer per column and a single copy of every file into its slice.
+        # Numeric columns take the widest per-file dtype; categorical columns are recoded onto
+        # the union of categories, where pd.concat would fall back to object columns.
+        sizes = [len(frame) for frame in frames]
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        total = int(offsets[-1])
+        columns = {}
+        for name in frames[0].columns:
+            parts = [frame[name] for frame in frames]
+            if isinstance(parts[0].dtype, pd.CategoricalDtype):
+                categories = sorted(set().union(*[[str(value) for value in part.cat.categories] for part in parts]))
+                index = {category: i for i, category in enumerate(categories)}
+                codes = np.empty(total, dtype=np.int16 if len(categories) < 32767 else np.int32)
+                for part, begin, end in zip(parts, offsets[:-1], offsets[1:]):
+                    # Missing values keep code -1 through the trailing lookup entry
+                    lookup = np.array([index[str(value)] for value in part.cat.categories] + [-1], dtype=codes.dtype)
+                    codes[begin:end] = lookup[part.cat.codes.to_numpy()]
+                columns[name] = pd.Categorical.from_codes(codes, categories=categories)
+            else:
+                buffer = np.empty(total, dtype=np.result_type(*[part.dtype for part in parts]))
+                for part, begin, end in zip(parts, offsets[:-1], offsets[1:]):
+                    buffer[begin:end] = part.to_numpy()
+                columns[name] = buffer
+        if sources is not None:
+            columns['source_file'] = pd.Categorical.from_codes(
+                np.repeat(np.arange(len(sources), dtype=np.int32), sizes), categories=sources)
+        return pd.DataFrame(columns, copy=False)
+    
+    def load_files(self, sources, use_cache=True, workers=None):
+        # pyarrow and the C parser release the GIL while parsing, so a thread pool scales with
+        # cores and the parsed frames come back without pickling
+        workers = min(workers or os.cpu_count() or 1, len(sources))
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            loaded = list(executor.map(lambda path: self.parse_file(path, use_cache), sources))
+        parse_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        data = self.combine_frames([frame for frame, engine in loaded], sources)
+        combine_seconds = time.perf_counter() - start
+        engines = {}
+        for frame, engine in loaded:
+            engines[engine] = engines.get(engine, 0) + 1
+        stats = {
+            'engine': ",".join(f"{engine}:{count}" for engine, count in sorted(engines.items())),
+            'parse_seconds': parse_seconds + combine_seconds,
+            'combine_seconds': combine_seconds,
+            'files': len(sources),
+            'workers': workers,
+            'rows_per_file': {path: len(frame) for path, (frame, engine) in zip(sources, loaded)},
+        }
+        return data, stats
+    
+    def load_sample(self, filename, size, stratify=None, seed=0):
+        # stratify is None (uniform), 'proportional' or 'equal' per attack_type
+        fields_after_label = None
+        if stratify is not None:
+            fields_after_label = len(self.feature_names) - 1 - self.feature_names.index('attack_type')
+        raw, total, quotas, counts = sample_csv_lines(filename, size, fields_after_label, stratify or 'proportional',
+                                                      seed)
+        data = pd.read_csv(io.BytesIO(raw), names=self.feature_names, dtype=self.build_dtype_schema(), engine="c")
+        return self.downcast_counters(data), total, quotas, counts
+    
+    @instrumented_step
+    def step1_load_real_csv(self, filename, chunksize=None, use_cache=True, sample=None, stratify=None, seed=0,
+                            dedup=False, workers=None, columns=None, filters=None):
+        # filename may be one file, a list of files, a glob pattern or a directory.
+        # columns and filters (column -> value or list of values) are pushed into the reader,
+        # so only those columns are parsed and only matching rows are kept.
+        self.sources = resolve_sources(filename)
+        if len(self.sources) == 1:
+            filename = self.sources[0]
+        self.csv_filename = self.sources[0] if self.sources else filename
+        self.chunksize = chunksize
+        self.data = None
+        self.weights = None
+        self.record_rows = None
+        self.groups = None
+        self.statistics = None
+        self.encoder = None
+        self.encoded_matrix = None
+        self.active_cache_dir = None
+        self.projection = None if columns is None else list(columns)
+        self.row_filters = None
+        
+        unknown = [name for name in list(columns or []) + list(filters or {}) if name not in self.feature_names]
+        if unknown:
+            print("Error loading data: unknown columns:", ", ".join(unknown))
+            self.chunksize = None
+            return False
+        if filters:
+            # Checked before anything is read, so a bad value fails the same way in every mode
+            try:
+                self.row_filters = self.parse_filter_values(filters)
+            except ValueError as e:
+                print("Error loading data: invalid filter:", str(e))
+                self.chunksize = None
+                return False
+        if self.projection is not None:
+            print(f"Loading {len(self.loaded_columns())} of {len(self.feature_names)} columns:",
+                  ", ".join(self.loaded_columns()))
+        if self.row_filters:
+            print("Keeping rows where", " and ".join(
+                f"{name} in {values}" if isinstance(values, list) else f"{name} == {values!r}"
+                for name, values in filters.items()))
+        
+        missing = [path for path in self.sources if not os.path.exists(path)]
+        if not self.sources or missing:
+            print("Error loading data: file not found:", missing[0] if missing else filename)
+            print("Make sure your file path is correct")
+            self.chunksize = None
+            return False
+        
+        if chunksize is not None:
+            # Streaming mode: nothing is materialized, later steps reduce over chunks
+            print("Streaming data from:", filename if len(self.sources) == 1 else f"{len(self.sources)} files")
+            print("Chunk size:", chunksize)
+            print("Total features:", len(self.feature_names))
+            if dedup:
+                print("Deduplication needs the data in memory; streaming every record instead")
+            return not self.query_matched_nothing()
+        
+        if sample is not None and (len(self.sources) > 1 or RecordStore.is_store(self.sources[0])):
+            print("Error loading data: sampling works on a single CSV file")
+            return False
+        
+        if sample is not None:
+            # A representative sample from one streaming pass; nothing else is kept or cached
+            try:
+                start = time.perf_counter()
+                self.data, total, quotas, counts = self.load_sample(filename, sample, stratify, seed)
+                sampled = len(self.data)
+                if self.has_query():
+                    self.data = self.apply_query(self.data)
+            except (OSError, ValueError) as e:
+                print("Error loading data:", str(e))
+                print("Make sure your file path is correct")
+                return False
+            sample_seconds = time.perf_counter() - start
+            self.rows_processed += len(self.data)
+            self.load_stats = {
+                'engine': 'sample',
+                'parse_seconds': sample_seconds,
+                'memory_bytes': int(self.data.memory_usage(deep=True).sum()),
+                'sampled_from': total,
+                'stratify': stratify,
+            }
+            print("Data sampled from:", filename)
+            print(f"Sampled {sampled} of {total} records "
+                  f"({'uniform' if stratify is None else stratify + ' per attack_type'}) in {sample_seconds:.3f}s")
+            if stratify is not None:
+                for label in sorted(counts, key=lambda label: (-counts[label], label)):
+                    print(f"  {label}: {quotas[label]} of {counts[label]}")
+            if self.row_filters:
+                print(f"Kept {len(self.data)} sampled records matching the filters")
+            if self.query_matched_nothing():
+                return False
+            if dedup:
+                self.deduplicate()
+            print("Shape:", self.data.shape)
+            return True
+        
+        if len(self.sources) > 1:
+            try:
+                self.data, self.load_stats = self.load_files(self.sources, use_cache, workers)
+            except Exception as e:
+                print("Error loading data:", str(e))
+                print("Make sure your file path is correct")
+                return False
+            self.rows_processed += len(self.data)
+            self.load_stats['memory_bytes'] = int(self.data.memory_usage(deep=True).sum())
+            if self.has_query():
+                self.load_stats.update({'columns': self.loaded_columns(), 'filters': self.row_filters})
+            print(f"Data loaded successfully from {len(self.sources)} files "
+                  f"on {self.load_stats['workers']} threads")
+            if self.verbose:
+                for path, rows in self.load_stats['rows_per_file'].items():
+                    print(f"  {path}: {rows} records")
+            print("Shape:", self.data.shape)
+            print("Total records:", len(self.data))
+            print("Total features:", len(self.feature_names))
+            print(f"Parse time: {self.load_stats['parse_seconds']:.3f}s "
+                  f"(engine={self.load_stats['engine']}, combine {self.load_stats['combine_seconds']:.3f}s)")
+            print(f"Memory footprint: {self.load_stats['memory_bytes'] / 1024 ** 2:.2f} MB")
+            if self.query_matched_nothing():
+                return False
+            if dedup:
+                self.deduplicate()
+            return True
         
         try:
-            # Load the actual NSL-KDD dataset
-            self.data = pd.read_csv(filename, names=self.feature_names)
+            start = time.perf_counter()
+            if RecordStore.is_store(filename):
+                # Already columnar: the frame wraps the memory-mapped column files
+                engine = "store"
+                self.data = self.apply_query(store_frame(RecordStore.open(filename), columns=self.loaded_columns()))
+                use_cache = False
+            else:
+                data = self.load_cache(filename, self.loaded_columns()) if use_cache else None
+                if data is not None:
+                    engine = "cache"
+                    self.data = self.apply_query(data) if self.has_query() else data
+                elif self.has_query():
+                    engine = "c"
+                    self.data = self.read_csv_query(filename)
+                else:
+                    # Load the actual NSL-KDD dataset with a fixed, compact schema
+                    engine = self.csv_engine()
+                    data = pd.read_csv(filename, names=self.feature_names,
+                                       dtype=self.build_dtype_schema(), engine=engine)
+                    self.data = self.downcast_counters(data)
+            parse_seconds = time.perf_counter() - start
+            self.rows_processed += len(self.data)
+            memory_bytes = int(self.data.memory_usage(deep=True).sum())
+            self.load_stats = {
+                'engine': engine,
+                'parse_seconds': parse_seconds,
+                'memory_bytes': memory_bytes,
+            }
+            if self.has_query():
+                self.load_stats.update({'columns': self.loaded_columns(), 'filters': self.row_filters})
             
             print("Data loaded successfully from:", filename)
             print("Shape:", self.data.shape)
             print("Total records:", len(self.data))
             print("Total features:", len(self.data.columns))
+            print(f"Parse time: {parse_seconds:.3f}s (engine={engine})")
+            print(f"Memory footprint: {memory_bytes / 1024 ** 2:.2f} MB")
+            
+            # The cache and what is persisted next to it describe the whole file
+            use_cache = use_cache and not self.has_query()
+            if use_cache and engine != "cache":
+                try:
+                    print("Wrote columnar cache:", self.write_cache(filename))
+                except OSError as e:
+                    print("Could not write columnar cache:", str(e))
+            if use_cache and os.path.exists(os.path.join(self.cache_dir_for(filename), 'meta.json')):
+                self.active_cache_dir = self.cache_dir_for(filename)
+            if self.query_matched_nothing():
+                return False
+            # After the cache is written, so the cache always holds every record
+            if dedup:
+                self.deduplicate()
             
             return True
             
@@ -37,68 +1331,91 @@ class SimpleNSLKDDProcessor:
             print("Make sure your file path is correct")
             return False
     
+    @instrumented_step
     def step2_read_and_print_csv(self, num_lines=10):
-        if self.data is None:
+        if not self.has_data():
             print("No data loaded. Run step1_load_real_csv() first.")
             return
         
         print("Reading first", num_lines, "lines from:", self.csv_filename)
         print("-" * 80)
         
-        # Print header
-        print("Headers:")
-        for i, header in enumerate(self.feature_names):
-            print(f"  {i+1}. {header}")
-        print()
-        
-        # Print first few data rows
-        print("First", num_lines, "data rows:")
-        for i in range(min(num_lines, len(self.data))):
-            print(f"Line {i+1}:")
-            row = self.data.iloc[i]
-            for j, value in enumerate(row):
-                print(f"  {self.feature_names[j]}: {value}")
+        if self.verbose:
+            # Print header
+            print("Headers:")
+            for i, header in enumerate(self.loaded_columns()):
+                print(f"  {i+1}. {header}")
             print()
+            
+            # Print first few data rows
+            print("First", num_lines, "data rows:")
+            preview = self.head(num_lines)
+            for i in range(len(preview)):
+                print(f"Line {i+1}:")
+                row = preview.iloc[i]
+                for name, value in row.items():
+                    print(f"  {name}: {value}")
+                print()
         
         print("-" * 80)
         print("Data preview complete")
     
+    @instrumented_step
     def step3_extract_values(self):
-        if self.data is None:
+        if not self.has_data():
             print("No data loaded. Run step1_load_real_csv() first.")
             return
         
         print("Extracting and analyzing values from NSL-KDD dataset")
         print("-" * 80)
         
+        # Statistics are reduced chunk by chunk so the streaming path matches the in-memory one
+        statistics = self.compute_statistics()
+        
         # Basic statistics
         print("Dataset summary:")
-        print("  Total samples:", len(self.data))
-        print("  Total features:", len(self.data.columns))
+        print("  Total samples:", statistics.rows)
+        print("  Total features:", len(self.loaded_columns()))
         
         # Attack type distribution
         print("\nAttack type distribution:")
-        attack_counts = self.data['attack_type'].value_counts()
-        for attack_type, count in attack_counts.head(10).items():
+        for attack_type, count in statistics.sorted_counts('attack_type')[:10]:
             print(f"  {attack_type}: {count}")
         
         # Protocol type distribution
-        print("\nProtocol type distribution:")
-        protocol_counts = self.data['protocol_type'].value_counts()
-        for protocol, count in protocol_counts.items():
-            print(f"  {protocol}: {count}")
+        if 'protocol_type' in statistics.counts:
+            print("\nProtocol type distribution:")
+            for protocol, count in statistics.sorted_counts('protocol_type'):
+                print(f"  {protocol}: {count}")
+        
+        if 'service' in statistics.distinct:
+            print("\nDistinct services (approximate):", round(statistics.distinct['service'].estimate()))
+        
+        print("\nNumerical feature mean / std and quantiles (p50, p90, p99):")
+        moments = statistics.moments.summary()
+        for feature in ['duration', 'src_bytes', 'dst_bytes', 'count', 'srv_count']:
+            if feature not in moments:
+                continue
+            line = f"  {feature}: mean={moments[feature]['mean']:.2f}, std={moments[feature]['std']:.2f}"
+            if feature in statistics.quantiles:
+                digest = statistics.quantiles[feature]
+                line += ", quantiles=" + ", ".join(f"{digest.quantile(q):.0f}" for q in (0.5, 0.9, 0.99))
+            print(line)
+        self.results['step3'] = statistics.summary()
         
         # Basic feature statistics
         print("\nNumerical features sample (first 5 rows):")
         numerical_features = ['duration', 'src_bytes', 'dst_bytes', 'count', 'srv_count']
+        preview = self.head(5)
         for feature in numerical_features:
-            if feature in self.data.columns:
-                values = self.data[feature].head().tolist()
+            if feature in preview.columns:
+                values = preview[feature].tolist()
                 print(f"  {feature}: {values}")
         
         print("\nValue extraction complete")
         return True
     
+    @instrumented_step
     def step4_simple_prediction_function(self):
         def always_normal():
             return "normal"
@@ -110,8 +1427,8 @@ class SimpleNSLKDDProcessor:
         print("-" * 50)
         
         # Test with actual data samples
-        if self.data is not None:
-            test_samples = self.data.head(5)
+        if self.has_data() and self.verbose:
+            test_samples = self.head(5)
             
             print("Function 1 (always_normal):")
             for i, (idx, row) in enumerate(test_samples.iterrows()):
@@ -128,6 +1445,7 @@ class SimpleNSLKDDProcessor:
         print("\nSimple prediction functions created")
         return always_normal, always_attack
     
+    @instrumented_step
     def step5_input_based_prediction(self):
         def simple_rule_classifier(protocol_type, src_bytes, dst_bytes, service):
             # Rules based on common NSL-KDD attack patterns
@@ -142,178 +1460,209 @@ class SimpleNSLKDDProcessor:
             else:
                 return "normal"
         
+        simple_rule_classifier.predict_batch = rule_classifier_predict_batch
+        
         print("Testing input-based prediction function on real NSL-KDD data:")
         print("-" * 70)
         
-        if self.data is not None:
-            test_samples = self.data.head(10)
+        missing = [name for name in self.STEP_COLUMNS[5] if name not in self.loaded_columns()]
+        if missing:
+            print("Skipped: step 5 needs columns that were not loaded:", ", ".join(missing))
+        elif self.has_data():
+            test_samples = self.head(10)
             
-            correct_predictions = 0
-            total_predictions = 0
+            predictions = rule_classifier_predict_batch(test_samples)
+            actual_binary = binarize_attack_type(test_samples['attack_type'])
+            is_correct = predictions == actual_binary
+            correct_predictions = int(is_correct.sum())
+            total_predictions = len(test_samples)
             
-            for i, (idx, row) in enumerate(test_samples.iterrows()):
-                protocol = row['protocol_type']
-                src_bytes = row['src_bytes']
-                dst_bytes = row['dst_bytes']
-                service = row['service']
-                actual = row['attack_type']
-                
-                prediction = simple_rule_classifier(protocol, src_bytes, dst_bytes, service)
-                
-                # Check if prediction is correct (simplified)
-                actual_binary = "normal" if actual == "normal" else "attack"
-                is_correct = prediction == actual_binary
-                if is_correct:
-                    correct_predictions += 1
-                total_predictions += 1
-                
+            protocols = test_samples['protocol_type'].to_numpy()
+            src_values = test_samples['src_bytes'].to_numpy()
+            dst_values = test_samples['dst_bytes'].to_numpy()
+            services = test_samples['service'].to_numpy()
+            actuals = test_samples['attack_type'].to_numpy()
+            for i in range(total_predictions if self.verbose else 0):
                 print(f"Sample {i+1}:")
-                print(f"  Protocol: {protocol}, Src: {src_bytes}, Dst: {dst_bytes}, Service: {service}")
-                print(f"  Predicted: {prediction}, Actual: {actual}, Correct: {is_correct}")
+                print(f"  Protocol: {protocols[i]}, Src: {src_values[i]}, Dst: {dst_values[i]}, Service: {services[i]}")
+                print(f"  Predicted: {predictions[i]}, Actual: {actuals[i]}, Correct: {is_correct[i]}")
                 print()
             
             accuracy = correct_predictions / total_predictions
             print(f"Simple accuracy on {total_predictions} samples: {accuracy:.2f}")
+            
+            confusion = self.reduce_confusion(rule_classifier_predict_batch)
+            total_all = confusion.total()
+            if total_all:
+                print(f"Accuracy on all {total_all} records: {confusion.accuracy():.4f}")
+                self.print_evaluation(confusion)
+            self.results['step5'] = {
+                'sample_accuracy': accuracy,
+                'accuracy': confusion.accuracy(),
+                'records': total_all,
+                'evaluation': confusion.summary(),
+            }
+            
+            print("\n" + "-" * 40)
+            print("Learning the rules from per-bin histograms instead...")
+            tree = self.train_tree_classifier(HistogramTreeClassifier())
+            self.tree_classifier = tree
+            print("First tree (leaf values are attack log-odds contributions):")
+            for line in tree.describe():
+                print("  " + line)
+            confusion = self.reduce_confusion(lambda data: tree.predict_batch(data)[0])
+            if confusion.total():
+                print(f"Learned tree accuracy on all {confusion.total()} records: {confusion.accuracy():.4f}")
+                self.print_evaluation(confusion)
+            self.results['step5']['tree_accuracy'] = confusion.accuracy()
+            self.results['step5']['tree_evaluation'] = confusion.summary()
         
         print("Input-based prediction function created")
         return simple_rule_classifier
     
+    @instrumented_step
     def step6_simple_linear_classifier(self):
-        class SimpleLinearClassifier:
-            def __init__(self):
-                # Weights for different features
-                self.weight_duration = 0.1
-                self.weight_src_bytes = 0.0001
-                self.weight_dst_bytes = 0.0001
-                self.weight_count = 0.01
-                self.threshold = 1.0
-                
-            def predict(self, duration, src_bytes, dst_bytes, count):
-                score = (self.weight_duration * duration + 
-                        self.weight_src_bytes * src_bytes +
-                        self.weight_dst_bytes * dst_bytes +
-                        self.weight_count * count)
-                
-                if score > self.threshold:
-                    return "attack"
-                else:
-                    return "normal"
+        def print_linear_predictions(test_samples):
+            predictions, scores = classifier.predict_batch(test_samples)
+            actual_binary = binarize_attack_type(test_samples['attack_type'])
+            correct = int((predictions == actual_binary).sum())
             
-            def update_weights(self, new_duration_w, new_src_w, new_dst_w, new_count_w, new_threshold):
-                self.weight_duration = new_duration_w
-                self.weight_src_bytes = new_src_w
-                self.weight_dst_bytes = new_dst_w
-                self.weight_count = new_count_w
-                self.threshold = new_threshold
-                
-                print("Updated parameters:")
-                print(f"  duration weight: {self.weight_duration}")
-                print(f"  src_bytes weight: {self.weight_src_bytes}")
-                print(f"  dst_bytes weight: {self.weight_dst_bytes}")
-                print(f"  count weight: {self.weight_count}")
-                print(f"  threshold: {self.threshold}")
+            durations = test_samples['duration'].to_numpy()
+            src_values = test_samples['src_bytes'].to_numpy()
+            dst_values = test_samples['dst_bytes'].to_numpy()
+            counts = test_samples['count'].to_numpy()
+            actuals = test_samples['attack_type'].to_numpy()
+            for i in range(len(test_samples) if self.verbose else 0):
+                print(f"Sample {i+1}: dur={durations[i]}, src={src_values[i]}, dst={dst_values[i]}, cnt={counts[i]}")
+                print(f"  Score: {scores[i]:.3f}, Predicted: {predictions[i]}, Actual: {actuals[i]}")
+            return correct
+        
+        def predict_labels(data):
+            return classifier.predict_batch(data)[0]
         
         print("Testing simple linear classifier on real NSL-KDD data:")
         print("-" * 70)
         
         classifier = SimpleLinearClassifier()
         
-        if self.data is not None:
-            test_samples = self.data.head(8)
+        missing = [name for name in self.STEP_COLUMNS[6] if name not in self.loaded_columns()]
+        if missing:
+            print("Skipped: step 6 needs columns that were not loaded:", ", ".join(missing))
+        elif self.has_data():
+            test_samples = self.head(8)
+            step6_results = {}
+            self.results['step6'] = step6_results
             
             print("Initial predictions:")
-            correct_initial = 0
-            for i, (idx, row) in enumerate(test_samples.iterrows()):
-                duration = row['duration']
-                src_bytes = row['src_bytes']
-                dst_bytes = row['dst_bytes']
-                count = row['count']
-                actual = row['attack_type']
-                
-                prediction = classifier.predict(duration, src_bytes, dst_bytes, count)
-                score = (classifier.weight_duration * duration + 
-                        classifier.weight_src_bytes * src_bytes +
-                        classifier.weight_dst_bytes * dst_bytes +
-                        classifier.weight_count * count)
-                
-                actual_binary = "normal" if actual == "normal" else "attack"
-                is_correct = prediction == actual_binary
-                if is_correct:
-                    correct_initial += 1
-                
-                print(f"Sample {i+1}: dur={duration}, src={src_bytes}, dst={dst_bytes}, cnt={count}")
-                print(f"  Score: {score:.3f}, Predicted: {prediction}, Actual: {actual}")
+            correct_initial = print_linear_predictions(test_samples)
             
             initial_accuracy = correct_initial / len(test_samples)
             print(f"Initial accuracy: {initial_accuracy:.2f}")
             
+            correct_all, total_all = self.reduce_accuracy(predict_labels)
+            if total_all:
+                print(f"Initial accuracy on all {total_all} records: {correct_all / total_all:.4f}")
+            step6_results['initial_accuracy'] = correct_all / total_all if total_all else None
+            
             print("\n" + "-" * 40)
             print("Updating parameters...")
             classifier.update_weights(0.05, 0.0002, 0.0002, 0.02, 0.5)
             
             print("\nPredictions after parameter update:")
-            correct_updated = 0
-            for i, (idx, row) in enumerate(test_samples.iterrows()):
-                duration = row['duration']
-                src_bytes = row['src_bytes']
-                dst_bytes = row['dst_bytes']
-                count = row['count']
-                actual = row['attack_type']
-                
-                prediction = classifier.predict(duration, src_bytes, dst_bytes, count)
-                score = (classifier.weight_duration * duration + 
-                        classifier.weight_src_bytes * src_bytes +
-                        classifier.weight_dst_bytes * dst_bytes +
-                        classifier.weight_count * count)
-                
-                actual_binary = "normal" if actual == "normal" else "attack"
-                is_correct = prediction == actual_binary
-                if is_correct:
-                    correct_updated += 1
-                
-                print(f"Sample {i+1}: dur={duration}, src={src_bytes}, dst={dst_bytes}, cnt={count}")
-                print(f"  Score: {score:.3f}, Predicted: {prediction}, Actual: {actual}")
+            correct_updated = print_linear_predictions(test_samples)
             
             updated_accuracy = correct_updated / len(test_samples)
             print(f"Updated accuracy: {updated_accuracy:.2f}")
+            
+            correct_all, total_all = self.reduce_accuracy(predict_labels)
+            if total_all:
+                print(f"Updated accuracy on all {total_all} records: {correct_all / total_all:.4f}")
+            step6_results['updated_accuracy'] = correct_all / total_all if total_all else None
+            
+            print("\n" + "-" * 40)
+            print("Training weights and threshold on the loaded data...")
+            self.train_linear_classifier(classifier)
+            
+            print("\nPredictions after training:")
+            correct_trained = print_linear_predictions(test_samples)
+            
+            trained_accuracy = correct_trained / len(test_samples)
+            print(f"Trained accuracy: {trained_accuracy:.2f}")
+            
+            confusion = self.reduce_confusion(predict_labels, encoded=True)
+            if confusion.total():
+                print(f"Trained accuracy on all {confusion.total()} records: {confusion.accuracy():.4f}")
+                self.print_evaluation(confusion)
+            step6_results['trained_accuracy'] = confusion.accuracy()
+            step6_results['trained_evaluation'] = confusion.summary()
+            
+            print("\n" + "-" * 40)
+            sweep = self.sweep_thresholds(classifier, max_fpr=self.target_fpr)
+            if sweep is not None:
+                best_f1 = sweep['best_f1']
+                best_at_fpr = sweep['best_at_fpr']
+                print(f"Threshold sweep over {sweep['rows']} records ({len(sweep['thresholds'])} cut points):")
+                print(f"  ROC AUC: {sweep['roc_auc']:.4f}, average precision: {sweep['average_precision']:.4f}")
+                print(f"  best F1 threshold: {best_f1['threshold']:.4f} (F1={best_f1['f1']:.4f}, "
+                      f"precision={best_f1['precision']:.4f}, recall={best_f1['tpr']:.4f}, "
+                      f"accuracy={best_f1['accuracy']:.4f})")
+                print(f"  threshold for FPR <= {self.target_fpr:g}: {best_at_fpr['threshold']:.4f} "
+                      f"(TPR={best_at_fpr['tpr']:.4f}, FPR={best_at_fpr['fpr']:.4f})")
+                step6_results['threshold_sweep'] = {
+                    key: sweep[key] for key in
+                    ('roc_auc', 'average_precision', 'best_f1', 'best_accuracy', 'best_at_fpr')
+                }
         
         print("\nSimple linear classifier with learnable parameters created")
         return classifier
     
-    def run_complete_simple_pipeline(self, dataset_path):
+    def run_complete_simple_pipeline(self, dataset_path, steps=None, interactive=True,
+                                     chunksize=None, use_cache=True, sample=None, stratify=None, seed=0,
+                                     dedup=False, workers=None, columns=None, filters=None):
+        # Step 1 always runs because every other step needs the data
+        steps = sorted(set(steps or [1, 2, 3, 4, 5, 6]) | {1})
+        if columns == 'auto':
+            # Only what the selected steps read
+            columns = self.required_columns(steps)
+        timings = {}
+        self.results['timings'] = timings
+        
+        def run_step(number, title, function):
+            if interactive and number != steps[0]:
+                input(f"\nPress Enter to continue to Step {number}...")
+            print(f"\nSTEP {number}: {title}")
+            start = time.perf_counter()
+            result = function()
+            timings[f'step{number}'] = time.perf_counter() - start
+            return result
+        
         print("Starting Simple Step-by-Step Pipeline with Real NSL-KDD Data")
-        print("Dataset path:", dataset_path)
+        print("Dataset path:", dataset_path if isinstance(dataset_path, str) else ", ".join(dataset_path))
         print("=" * 80)
         
-        print("\nSTEP 1: Loading real NSL-KDD CSV file")
-        if not self.step1_load_real_csv(dataset_path):
+        loaded = run_step(1, "Loading real NSL-KDD CSV file",
+                          lambda: self.step1_load_real_csv(dataset_path, chunksize=chunksize,
+                                                           use_cache=use_cache, sample=sample,
+                                                           stratify=stratify, seed=seed, dedup=dedup,
+                                                           workers=workers, columns=columns, filters=filters))
+        self.results['loaded'] = loaded
+        if not loaded:
             print("Failed to load dataset. Please check the file path.")
             return None
         
-        input("\nPress Enter to continue to Step 2...")
-        
-        print("\nSTEP 2: Reading and printing CSV content")
-        self.step2_read_and_print_csv(5)  # Show first 5 records
-        
-        input("\nPress Enter to continue to Step 3...")
-        
-        print("\nSTEP 3: Extracting and analyzing values")
-        self.step3_extract_values()
-        
-        input("\nPress Enter to continue to Step 4...")
-        
-        print("\nSTEP 4: Creating simple prediction functions")
-        self.step4_simple_prediction_function()
-        
-        input("\nPress Enter to continue to Step 5...")
-        
-        print("\nSTEP 5: Creating input-based prediction function")
-        self.step5_input_based_prediction()
-        
-        input("\nPress Enter to continue to Step 6...")
-        
-        print("\nSTEP 6: Creating simple linear classifier")
-        classifier = self.step6_simple_linear_classifier()
+        classifier = None
+        if 2 in steps:
+            run_step(2, "Reading and printing CSV content",
+                     lambda: self.step2_read_and_print_csv(5))  # Show first 5 records
+        if 3 in steps:
+            run_step(3, "Extracting and analyzing values", self.step3_extract_values)
+        if 4 in steps:
+            run_step(4, "Creating simple prediction functions", self.step4_simple_prediction_function)
+        if 5 in steps:
+            run_step(5, "Creating input-based prediction function", self.step5_input_based_prediction)
+        if 6 in steps:
+            classifier = run_step(6, "Creating simple linear classifier",
+                                  self.step6_simple_linear_classifier)
         
         print("\n" + "=" * 80)
         print("PIPELINE COMPLETE - WORKING WITH REAL NSL-KDD DATA")
@@ -327,14 +1676,150 @@ class SimpleNSLKDDProcessor:
         
         return classifier
 
-def main():
+def parse_steps(value):
+    try:
+        steps = [int(step) for step in value.split(',') if step.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid step list: {value!r}")
+    if not steps or any(step < 1 or step > 6 for step in steps):
+        raise argparse.ArgumentTypeError("steps must be numbers between 1 and 6")
+    return steps
+
+def parse_filters(value):
+    # "service=private,attack_type=smurf|neptune": columns are ANDed, | separates allowed values
+    filters = {}
+    for part in value.split(','):
+        name, sep, values = part.partition('=')
+        if not sep or not name.strip() or not values:
+            raise argparse.ArgumentTypeError(f"invalid filter: {part!r} (expected column=value)")
+        values = [item.strip() for item in values.split('|')]
+        filters[name.strip()] = values[0] if len(values) == 1 else values
+    return filters
+
+def parse_columns(value):
+    if value == 'auto':
+        return value
+    columns = [name.strip() for name in value.split(',') if name.strip()]
+    if not columns:
+        raise argparse.ArgumentTypeError("no columns given")
+    return columns
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simple NSL-KDD pipeline")
+    parser.add_argument('--data', nargs='+', required=True,
+                        help="NSL-KDD CSV files, glob patterns or directories of daily captures")
+    parser.add_argument('--columns', type=parse_columns,
+                        help="load only these comma-separated columns, or 'auto' for the ones the "
+                             "selected steps read (attack_type is always loaded)")
+    parser.add_argument('--filter', type=parse_filters,
+                        help="load only records matching e.g. protocol_type=tcp,attack_type=smurf|neptune")
+    parser.add_argument('--store', help="append the loaded records to this record store directory "
+                                        "(created if missing); pass it as --data to read them back")
+    parser.add_argument('--load-workers', type=int,
+                        help="threads parsing files concurrently when several are given (default: all cores)")
+    parser.add_argument('--steps', type=parse_steps, default=[1, 2, 3, 4, 5, 6],
+                        help="comma-separated steps to run, e.g. 1,3,6 (step 1 always runs)")
+    parser.add_argument('--quiet', action='store_true',
+                        help="skip the per-row console dumps")
+    parser.add_argument('--output', help="write timing and accuracy results as JSON to this file")
+    parser.add_argument('--chunksize', type=int, help="stream the file in chunks of this many rows")
+    parser.add_argument('--no-cache', action='store_true', help="always parse the CSV")
+    parser.add_argument('--sample', type=int,
+                        help="work on a random sample of this many records, drawn in one pass")
+    parser.add_argument('--stratify', choices=['proportional', 'equal'],
+                        help="with --sample, sample per attack_type: keep the file's mix or equal shares")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for --sample")
+    parser.add_argument('--dedup', action='store_true',
+                        help="keep one copy of each duplicated record with a weight; statistics and "
+                             "evaluations are unchanged, step6's trained model is close but not identical")
+    parser.add_argument('--where', type=parse_filters, action='append',
+                        help="after the pipeline, print statistics for the records matching e.g. "
+                             "protocol_type=icmp,attack_type=smurf|pod (repeatable)")
+    parser.add_argument('--interactive', action='store_true',
+                        help="pause for Enter between steps")
+    parser.add_argument('--instrument', action='store_true',
+                        help="record per-step wall/CPU time, memory and rows processed")
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help="with --instrument, skip tracemalloc (lower overhead)")
+    parser.add_argument('--prometheus', help="write step metrics in Prometheus text format to this file")
+    parser.add_argument('--target-fpr', type=float, default=0.01,
+                        help="false-positive rate budget for step6's threshold sweep")
+    parser.add_argument('--save-model', help="save step6's trained linear classifier to this JSON file "
+                                             "(loadable by score_records.py)")
+    parser.add_argument('--save-tree', help="save step5's learned tree model to this JSON file")
+    parser.add_argument('--score-workers', type=int,
+                        help="after the pipeline, score the whole file with step5/step6 classifiers "
+                             "on this many worker processes")
+    args = parser.parse_args(argv)
+    if args.store and (args.columns or args.filter):
+        # The store keeps whole records of every capture, not the result of a query
+        parser.error("--store cannot be combined with --columns or --filter")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
     print("Starting with real NSL-KDD dataset...")
     
-    dataset_path = r"C:\Users\Admin\test\KDDTrain+.csv"
+    # A single path is passed on as a plain string, several as a list
+    data = args.data[0] if len(args.data) == 1 else args.data
     processor = SimpleNSLKDDProcessor()
-    classifier = processor.run_complete_simple_pipeline(dataset_path)
+    processor.verbose = not args.quiet
+    processor.target_fpr = args.target_fpr
+    if args.instrument or args.prometheus:
+        processor.metrics.enable(trace_memory=not args.no_trace_memory)
+    classifier = processor.run_complete_simple_pipeline(
+        data, steps=args.steps, interactive=args.interactive,
+        chunksize=args.chunksize, use_cache=not args.no_cache, sample=args.sample,
+        stratify=args.stratify, seed=args.seed, dedup=args.dedup, workers=args.load_workers,
+        columns=args.columns, filters=args.filter)
+    
+    if args.store and processor.results.get('loaded'):
+        try:
+            processor.append_to_store(args.store)
+        except (OSError, ValueError) as e:
+            print("Could not append to the record store:", str(e))
+    
+    if args.where and processor.data is not None:
+        print()
+        for filters in args.where:
+            try:
+                processor.describe_slice(filters)
+            except KeyError as e:
+                print("Cannot slice:", str(e))
+    
+    if args.score_workers and classifier is not None:
+        print("\nParallel scoring of:", data if isinstance(data, str) else ", ".join(data))
+        processor.parallel_score_file(data, classifier, workers=args.score_workers)
+    
+    if args.save_model and classifier is not None:
+        classifier.save(args.save_model, processor.feature_names)
+        print("Model written to:", args.save_model)
+    
+    if args.save_tree and processor.tree_classifier is not None:
+        processor.tree_classifier.save(args.save_tree, processor.feature_names)
+        print("Tree model written to:", args.save_tree)
+    
+    if args.output:
+        metrics = {
+            'data': data,
+            'steps': args.steps,
+            'load': processor.load_stats,
+        }
+        metrics.update(processor.results)
+        if processor.metrics.enabled:
+            metrics['stages'] = processor.metrics.to_dict()
+        with open(args.output, 'w') as file:
+            json.dump(metrics, file, indent=2)
+        print("Metrics written to:", args.output)
+    
+    if args.prometheus:
+        with open(args.prometheus, 'w') as file:
+            file.write(processor.metrics.to_prometheus())
+        print("Prometheus metrics written to:", args.prometheus)
     
     return processor, classifier
 
 if __name__ == "__main__":
     processor, classifier = main()
+    if not processor.results.get('loaded'):
+        sys.exit(1)
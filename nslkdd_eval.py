@@ -0,0 +1,196 @@
+import numpy as np
+
+# The usual NSL-KDD grouping of attack types into the four attack families
+ATTACK_FAMILIES = {
+    'DoS': ['apache2', 'back', 'land', 'mailbomb', 'neptune', 'pod', 'processtable', 'smurf',
+            'teardrop', 'udpstorm', 'worm'],
+    'Probe': ['ipsweep', 'mscan', 'nmap', 'portsweep', 'saint', 'satan'],
+    'R2L': ['ftp_write', 'guess_passwd', 'httptunnel', 'imap', 'multihop', 'named', 'phf', 'sendmail',
+            'snmpgetattack', 'snmpguess', 'spy', 'warezclient', 'warezmaster', 'xlock', 'xsnoop'],
+    'U2R': ['buffer_overflow', 'loadmodule', 'perl', 'ps', 'rootkit', 'sqlattack', 'xterm'],
+}
+FAMILY_OF = {attack: family for family, attacks in ATTACK_FAMILIES.items() for attack in attacks}
+FAMILIES = ['normal'] + list(ATTACK_FAMILIES) + ['unknown']
+
+
+def attack_family(label):
+    if label == 'normal':
+        return 'normal'
+    return FAMILY_OF.get(label, 'unknown')
+
+
+def label_codes(values, labels, index):
+    # Integer codes for a column of labels; labels not seen before are appended to `labels`.
+    # Categorical columns map through their categories, fixed-width string arrays (what the
+    # classifiers return) through one comparison per known label, anything else through np.unique.
+    if hasattr(values, 'cat'):
+        categories = [str(category) for category in values.cat.categories]
+        raw = values.cat.codes.to_numpy()
+    else:
+        values = np.asarray(values)
+        if values.dtype.kind == 'U':
+            codes = np.full(len(values), -1, dtype=np.int64)
+            for label in labels:
+                codes[values == label] = index[label]
+            if (codes >= 0).all():
+                return codes
+        unique, raw = np.unique(values.astype(str), return_inverse=True)
+        categories = list(unique)
+        raw = raw.reshape(-1)
+    if (raw < 0).any():
+        # Missing categorical values have code -1, which picks a trailing 'missing' entry
+        categories.append('missing')
+    lookup = []
+    for category in categories:
+        if category not in index:
+            index[category] = len(labels)
+            labels.append(category)
+        lookup.append(index[category])
+    return np.array(lookup, dtype=np.int64)[raw]
+
+
+def ratio(numerator, denominator):
+    return numerator / denominator if denominator else None
+
+
+class ConfusionMatrix:
+    # Counts of (actual attack_type, predicted label) pairs. Both label lists grow as new labels
+    # show up, and partial matrices from chunks or worker processes merge by label name.
+    def __init__(self, predicted_labels=('normal', 'attack')):
+        self.actual_labels = []
+        self.actual_index = {}
+        self.predicted_labels = []
+        self.predicted_index = {}
+        for label in predicted_labels:
+            self.predicted_index[label] = len(self.predicted_labels)
+            self.predicted_labels.append(label)
+        self.matrix = np.zeros((0, len(self.predicted_labels)), dtype=np.int64)
+
+    def resize(self):
+        rows, columns = len(self.actual_labels), len(self.predicted_labels)
+        if self.matrix.shape != (rows, columns):
+            grown = np.zeros((rows, columns), dtype=np.int64)
+            grown[:self.matrix.shape[0], :self.matrix.shape[1]] = self.matrix
+            self.matrix = grown
+
+    def update(self, actual, predicted, weights=None):
+        # weights: optional per-row multiplicities, e.g. of deduplicated records
+        actual = label_codes(actual, self.actual_labels, self.actual_index)
+        predicted = label_codes(predicted, self.predicted_labels, self.predicted_index)
+        self.resize()
+        rows, columns = self.matrix.shape
+        # Every (actual, predicted) pair is one flat cell, so a single bincount fills the matrix
+        cells = np.bincount(actual * columns + predicted, weights=weights, minlength=rows * columns)
+        self.matrix += cells.astype(np.int64).reshape(rows, columns)
+        return self
+
+    def merge(self, other):
+        for label in other.actual_labels:
+            if label not in self.actual_index:
+                self.actual_index[label] = len(self.actual_labels)
+                self.actual_labels.append(label)
+        for label in other.predicted_labels:
+            if label not in self.predicted_index:
+                self.predicted_index[label] = len(self.predicted_labels)
+                self.predicted_labels.append(label)
+        self.resize()
+        rows = [self.actual_index[label] for label in other.actual_labels]
+        columns = [self.predicted_index[label] for label in other.predicted_labels]
+        self.matrix[np.ix_(rows, columns)] += other.matrix
+        return self
+
+    def total(self):
+        return int(self.matrix.sum())
+
+    def expected_label(self, actual):
+        # What a correct prediction looks like in this matrix's label space
+        if actual in self.predicted_index:
+            return actual
+        family = attack_family(actual)
+        if family in self.predicted_index:
+            return family
+        if actual != 'normal' and 'attack' in self.predicted_index:
+            return 'attack'
+        return None
+
+    def expected_codes(self):
+        expected = [self.expected_label(label) for label in self.actual_labels]
+        return np.array([-1 if label is None else self.predicted_index[label] for label in expected],
+                        dtype=np.int64)
+
+    def correct(self):
+        expected = self.expected_codes()
+        rows = np.flatnonzero(expected >= 0)
+        return int(self.matrix[rows, expected[rows]].sum())
+
+    def accuracy(self):
+        return ratio(self.correct(), self.total())
+
+    def attack_masks(self):
+        actual = np.array([label != 'normal' for label in self.actual_labels], dtype=bool)
+        predicted = np.array([label != 'normal' for label in self.predicted_labels], dtype=bool)
+        return actual, predicted
+
+    def binary_counts(self):
+        # Attack vs normal, whatever the predicted label space is
+        actual, predicted = self.attack_masks()
+        return {
+            'tp': int(self.matrix[actual][:, predicted].sum()),
+            'fp': int(self.matrix[~actual][:, predicted].sum()),
+            'tn': int(self.matrix[~actual][:, ~predicted].sum()),
+            'fn': int(self.matrix[actual][:, ~predicted].sum()),
+        }
+
+    def binary(self):
+        counts = self.binary_counts()
+        precision = ratio(counts['tp'], counts['tp'] + counts['fp'])
+        recall = ratio(counts['tp'], counts['tp'] + counts['fn'])
+        f1 = ratio(2 * counts['tp'], 2 * counts['tp'] + counts['fp'] + counts['fn'])
+        return dict(counts, precision=precision, recall=recall, f1=f1)
+
+    def per_class(self):
+        # Precision/recall/F1 for every predicted label, actual labels mapped into that space
+        expected = self.expected_codes()
+        predicted_totals = self.matrix.sum(axis=0)
+        report = {}
+        for column, label in enumerate(self.predicted_labels):
+            rows = np.flatnonzero(expected == column)
+            tp = int(self.matrix[rows, column].sum())
+            support = int(self.matrix[rows].sum())
+            report[label] = {
+                'support': support,
+                'precision': ratio(tp, int(predicted_totals[column])),
+                'recall': ratio(tp, support),
+                'f1': ratio(2 * tp, support + int(predicted_totals[column])),
+            }
+        return report
+
+    def per_attack(self):
+        # Detection rate per actual label; for 'normal' that is the false-positive rate
+        actual, predicted = self.attack_masks()
+        records = self.matrix.sum(axis=1)
+        flagged = self.matrix[:, predicted].sum(axis=1)
+        return {label: {'records': int(records[i]), 'flagged': int(flagged[i]),
+                        'rate': ratio(int(flagged[i]), int(records[i]))}
+                for i, label in sorted(enumerate(self.actual_labels), key=lambda item: (-records[item[0]], item[1]))
+                if records[i]}
+
+    def per_family(self):
+        actual, predicted = self.attack_masks()
+        families = np.array([FAMILIES.index(attack_family(label)) for label in self.actual_labels],
+                            dtype=np.int64)
+        records = np.bincount(families, weights=self.matrix.sum(axis=1), minlength=len(FAMILIES))
+        flagged = np.bincount(families, weights=self.matrix[:, predicted].sum(axis=1), minlength=len(FAMILIES))
+        return {family: {'records': int(records[i]), 'flagged': int(flagged[i]),
+                         'rate': ratio(int(flagged[i]), int(records[i]))}
+                for i, family in enumerate(FAMILIES) if records[i]}
+
+    def summary(self):
+        return {
+            'records': self.total(),
+            'accuracy': self.accuracy(),
+            'binary': self.binary(),
+            'per_class': self.per_class(),
+            'per_family': self.per_family(),
+            'per_attack': self.per_attack(),
+        }
@@ -0,0 +1,126 @@
+import json
+
+import numpy as np
+
+from nslkdd_stats import column_values
+
+
+# The 41 connection features of an NSL-KDD record, then its label and difficulty level
+FEATURE_NAMES = [
+    'duration', 'protocol_type', 'service', 'flag', 'src_bytes', 'dst_bytes',
+    'land', 'wrong_fragment', 'urgent', 'hot', 'num_failed_logins', 'logged_in',
+    'num_compromised', 'root_shell', 'su_attempted', 'num_root', 'num_file_creations',
+    'num_shells', 'num_access_files', 'num_outbound_cmds', 'is_host_login',
+    'is_guest_login', 'count', 'srv_count', 'serror_rate', 'srv_serror_rate',
+    'rerror_rate', 'srv_rerror_rate', 'same_srv_rate', 'diff_srv_rate',
+    'srv_diff_host_rate', 'dst_host_count', 'dst_host_srv_count',
+    'dst_host_same_srv_rate', 'dst_host_diff_srv_rate', 'dst_host_same_src_port_rate',
+    'dst_host_srv_diff_host_rate', 'dst_host_serror_rate', 'dst_host_srv_serror_rate',
+    'dst_host_rerror_rate', 'dst_host_srv_rerror_rate', 'attack_type', 'difficulty_level'
+]
+
+
+class FeatureEncoder:
+    def __init__(self, feature_names, symbolic_columns=('protocol_type', 'service', 'flag'),
+                 label_column='attack_type', ignore_columns=('difficulty_level',), one_hot=True):
+        self.feature_names = list(feature_names)
+        self.symbolic_columns = [name for name in self.feature_names if name in symbolic_columns]
+        self.label_column = label_column
+        self.ignore_columns = list(ignore_columns)
+        self.one_hot = one_hot
+        self.input_columns = [name for name in self.feature_names
+                              if name != label_column and name not in self.ignore_columns]
+        self.vocabularies = None
+
+    def fit(self, frames):
+        # One pass over one or more frames collects the vocabulary of every symbolic column
+        seen = {column: set() for column in self.symbolic_columns}
+        for frame in frames:
+            for column in self.symbolic_columns:
+                values = frame[column]
+                if hasattr(values, 'value_counts'):
+                    counts = values.value_counts(sort=False)
+                    seen[column].update(str(value) for value in counts.index[counts.to_numpy() > 0])
+                else:
+                    seen[column].update(str(value) for value in np.unique(np.asarray(values, dtype=object)))
+        self.vocabularies = {column: sorted(values) for column, values in seen.items()}
+        return self
+
+    def is_fitted(self):
+        return self.vocabularies is not None
+
+    def output_columns(self):
+        columns = []
+        for name in self.input_columns:
+            if name in self.symbolic_columns and self.one_hot:
+                columns.extend(f"{name}={value}" for value in self.vocabularies[name])
+            else:
+                columns.append(name)
+        return columns
+
+    def codes(self, data, column):
+        # Map values to vocabulary positions without per-row Python work; unseen values get -1
+        index = {value: i for i, value in enumerate(self.vocabularies[column])}
+        values = data[column]
+        if hasattr(values, 'cat'):
+            lookup = np.array([index.get(str(value), -1) for value in values.cat.categories] + [-1],
+                              dtype=np.int32)
+            # Missing values have code -1, which picks the trailing -1 in the lookup table
+            return lookup[values.cat.codes.to_numpy()]
+        uniques, inverse = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+        lookup = np.array([index.get(value, -1) for value in uniques], dtype=np.int32)
+        return lookup[inverse.reshape(-1)]
+
+    def transform(self, data):
+        if self.vocabularies is None:
+            raise ValueError("FeatureEncoder must be fitted before transform")
+        rows = len(column_values(data, self.input_columns[0]))
+        matrix = np.zeros((rows, len(self.output_columns())), dtype=np.float32)
+        position = 0
+        for name in self.input_columns:
+            if name in self.symbolic_columns:
+                codes = self.codes(data, name)
+                if self.one_hot:
+                    known = np.flatnonzero(codes >= 0)
+                    matrix[known, position + codes[known]] = 1.0
+                    position += len(self.vocabularies[name])
+                    continue
+                matrix[:, position] = codes
+            else:
+                matrix[:, position] = column_values(data, name)
+            position += 1
+        return matrix
+
+    def encode_labels(self, data):
+        # 1 for any attack, 0 for normal traffic
+        return np.asarray(data[self.label_column] != "normal").astype(np.uint8)
+
+    def to_dict(self):
+        return {
+            'version': 1,
+            'feature_names': self.feature_names,
+            'symbolic_columns': self.symbolic_columns,
+            'label_column': self.label_column,
+            'ignore_columns': self.ignore_columns,
+            'one_hot': self.one_hot,
+            'vocabularies': self.vocabularies,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        if state.get('version') != 1:
+            raise ValueError(f"unsupported encoder version: {state.get('version')}")
+        encoder = cls(state['feature_names'], state['symbolic_columns'], state['label_column'],
+                      state['ignore_columns'], state['one_hot'])
+        encoder.vocabularies = state['vocabularies']
+        return encoder
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
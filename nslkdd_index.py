@@ -0,0 +1,124 @@
+import json
+import os
+
+import numpy as np
+
+INDEX_VERSION = 1
+
+
+class GroupIndex:
+    # Row offsets grouped by category for a few symbolic columns. Each column keeps one stable
+    # argsort of its codes, so every group is a contiguous, ascending run of row offsets and
+    # looking one up costs O(rows in the group), not O(rows in the data).
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    def build(self, data, columns):
+        self.rows = len(data)
+        self.columns = {}
+        for name in columns:
+            values = data[name]
+            if hasattr(values, 'cat'):
+                categories = [str(category) for category in values.cat.categories]
+                raw = values.cat.codes.to_numpy()
+            else:
+                unique, raw = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+                categories = list(unique)
+                raw = raw.reshape(-1)
+            # Code 0 collects missing values, category i gets code i + 1
+            codes = (raw.astype(np.int64) + 1).astype(np.int16 if len(categories) < 32767 else np.int32)
+            order = np.argsort(codes, kind='stable').astype(np.int32 if self.rows < 2 ** 31 else np.int64)
+            starts = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(categories) + 1))])
+            self.add_column(name, categories, codes, order, starts)
+        return self
+
+    def add_column(self, name, categories, codes, order, starts):
+        self.columns[name] = {
+            'categories': categories,
+            'lookup': {value: i + 1 for i, value in enumerate(categories)},
+            'codes': codes,
+            'order': order,
+            'starts': starts,
+        }
+
+    def group_codes(self, name, values):
+        # One value or a list of values; values the column never had match nothing
+        if name not in self.columns:
+            raise KeyError(f"no group index for column: {name}")
+        if isinstance(values, str):
+            values = [values]
+        lookup = self.columns[name]['lookup']
+        return sorted({lookup[str(value)] for value in values if str(value) in lookup})
+
+    def group_size(self, name, codes):
+        starts = self.columns[name]['starts']
+        return int(sum(starts[code + 1] - starts[code] for code in codes))
+
+    def group(self, name, value):
+        column = self.columns[name]
+        code = column['lookup'].get(str(value))
+        if code is None:
+            return np.zeros(0, dtype=column['order'].dtype)
+        return column['order'][column['starts'][code]:column['starts'][code + 1]]
+
+    def counts(self, name):
+        column = self.columns[name]
+        sizes = np.diff(column['starts'])
+        return {value: int(sizes[i + 1]) for i, value in enumerate(column['categories']) if sizes[i + 1]}
+
+    def select(self, filters):
+        # Ascending row offsets matching every filter. The filter with the fewest candidate rows
+        # is expanded; the other columns are checked by code on just those rows.
+        if not filters:
+            return np.arange(self.rows)
+        wanted = {name: self.group_codes(name, values) for name, values in filters.items()}
+        driver = min(wanted, key=lambda name: self.group_size(name, wanted[name]))
+        column = self.columns[driver]
+        parts = [column['order'][column['starts'][code]:column['starts'][code + 1]] for code in wanted[driver]]
+        if not parts:
+            return np.zeros(0, dtype=column['order'].dtype)
+        rows = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+        for name, codes in wanted.items():
+            if name == driver or not len(rows):
+                continue
+            allowed = np.zeros(len(self.columns[name]['categories']) + 1, dtype=bool)
+            allowed[codes] = True
+            rows = rows[allowed[self.columns[name]['codes'][rows]]]
+        return rows
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, 'index.json')
+        # Invalidate first so a half-written index is never read back
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name, column in self.columns.items():
+            for part in ('codes', 'order', 'starts'):
+                np.save(os.path.join(directory, f"{name}.{part}.npy"), column[part])
+        meta = {
+            'version': INDEX_VERSION,
+            'rows': self.rows,
+            'columns': {name: column['categories'] for name, column in self.columns.items()},
+        }
+        with open(meta_path, 'w') as file:
+            json.dump(meta, file)
+        return directory
+
+    @classmethod
+    def load(cls, directory, rows=None):
+        # None when there is no index or it was built for a different number of rows
+        meta_path = os.path.join(directory, 'index.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as file:
+            meta = json.load(file)
+        if meta.get('version') != INDEX_VERSION or (rows is not None and meta['rows'] != rows):
+            return None
+        index = cls()
+        index.rows = meta['rows']
+        for name, categories in meta['columns'].items():
+            parts = [np.load(os.path.join(directory, f"{name}.{part}.npy"), mmap_mode='r')
+                     for part in ('codes', 'order', 'starts')]
+            index.add_column(name, categories, *parts)
+        return index
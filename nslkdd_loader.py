@@ -0,0 +1,14 @@
+import importlib.util
+import os
+import sys
+
+
+def load_pipeline_module():
+    # main.py.py cannot be imported by name, so load it from its path
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py.py")
+    spec = importlib.util.spec_from_file_location("nslkdd_pipeline", path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so worker processes can pickle its functions by reference
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
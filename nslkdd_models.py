@@ -0,0 +1,723 @@
+import json
+
+import numpy as np
+
+from nslkdd_features import FeatureEncoder
+from nslkdd_stats import column_values
+
+# Model files are small JSON documents; bump the version when the layout changes
+LINEAR_MODEL_FORMAT = 'nslkdd-linear-classifier'
+TREE_MODEL_FORMAT = 'nslkdd-tree-classifier'
+MODEL_VERSION = 1
+
+
+def binarize_attack_type(attack_type):
+    # Comparing before converting keeps the fast code-based path for categorical columns
+    return np.where(np.asarray(attack_type == "normal"), "normal", "attack")
+
+
+def binary_target(y):
+    # 0/1 targets pass through, attack_type labels map to 1 for anything but "normal"
+    y = np.asarray(y)
+    if y.dtype.kind in 'biuf':
+        return (y > 0).astype(np.float64)
+    return (y != "normal").astype(np.float64)
+
+
+def rule_classifier_predict_batch(data):
+    # Vectorized form of step5's simple_rule_classifier, evaluated in rule order
+    src_bytes = np.asarray(data['src_bytes'])
+    dst_bytes = np.asarray(data['dst_bytes'])
+    conditions = [
+        np.asarray(data['protocol_type'] == "icmp"),
+        (src_bytes == 0) & (dst_bytes == 0),
+        np.asarray(data['service'] == "private"),
+        (src_bytes > 10000) | (dst_bytes > 10000),
+    ]
+    choices = ["attack", "attack", "attack", "normal"]
+    return np.select(conditions, choices, default="normal")
+
+
+def threshold_sweep(scores, target, max_fpr=None, weights=None):
+    # Every "score > threshold" cut at once: sort the scores, then cumulative sums give TP/FP per cut.
+    # weights are optional per-row multiplicities (deduplicated records count that many times).
+    scores = np.asarray(scores, dtype=np.float64)
+    target = binary_target(target)
+    weights = np.ones(len(target)) if weights is None else np.asarray(weights, dtype=np.float64)
+    total = float(weights.sum())
+    positives = float(weights @ target)
+    negatives = total - positives
+    # NaN scores never exceed a threshold, so they stay predicted-normal at every cut
+    finite = np.isfinite(scores)
+    order = np.argsort(-scores[finite], kind='stable')
+    ordered = scores[finite][order]
+    hits = (target * weights)[finite][order]
+    # Only the last row of each run of tied scores is a valid cut
+    cuts = np.flatnonzero(np.diff(ordered))
+    if len(ordered):
+        cuts = np.append(cuts, len(ordered) - 1)
+    tp = np.concatenate([[0.0], np.cumsum(hits)[cuts]])
+    fp = np.concatenate([[0.0], np.cumsum(weights[finite][order])[cuts] - tp[1:]])
+    # Just below each distinct score, so "score > threshold" keeps that score on the attack side
+    thresholds = np.concatenate([[ordered[0] if len(ordered) else np.inf],
+                                 np.nextafter(ordered[cuts], -np.inf)])
+    
+    tpr = tp / positives if positives else np.zeros_like(tp)
+    fpr = fp / negatives if negatives else np.zeros_like(fp)
+    predicted = tp + fp
+    precision = np.divide(tp, predicted, out=np.ones_like(tp), where=predicted > 0)
+    f1 = np.divide(2 * tp, predicted + positives, out=np.zeros_like(tp), where=(predicted + positives) > 0)
+    accuracy = (tp + negatives - fp) / total if total else np.zeros_like(tp)
+    
+    def point(i):
+        return {'threshold': float(thresholds[i]), 'tpr': float(tpr[i]), 'fpr': float(fpr[i]),
+                'precision': float(precision[i]), 'f1': float(f1[i]), 'accuracy': float(accuracy[i])}
+    
+    best_f1 = int(np.argmax(f1))
+    result = {
+        'rows': int(total),
+        'thresholds': thresholds,
+        'tpr': tpr,
+        'fpr': fpr,
+        'precision': precision,
+        'recall': tpr,
+        'f1': f1,
+        'accuracy': accuracy,
+        'roc_auc': float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)),
+        'average_precision': float(np.sum(np.diff(tpr) * precision[1:])),
+        'best_f1': point(best_f1),
+        'best_accuracy': point(int(np.argmax(accuracy))),
+    }
+    if max_fpr is not None:
+        # fpr only grows along the sweep, so the last cut within budget has the highest TPR
+        result['best_at_fpr'] = point(int(np.searchsorted(fpr, max_fpr, side='right')) - 1)
+    return result
+
+
+class SimpleLinearClassifier:
+    def __init__(self, encoder=None):
+        # Weights for different features
+        self.weight_duration = 0.1
+        self.weight_src_bytes = 0.0001
+        self.weight_dst_bytes = 0.0001
+        self.weight_count = 0.01
+        self.threshold = 1.0
+        self.feature_columns = ['duration', 'src_bytes', 'dst_bytes', 'count']
+        # Learned state, filled in by fit()/partial_fit()
+        self.encoder = encoder
+        self.mean = None
+        self.scale = None
+        self.coef = None
+        self.bias = 0.0
+        self.rng = np.random.default_rng(0)
+        # Column layout of the input records, stored with saved models for the scoring runtime
+        self.feature_names = None
+        
+    def predict(self, duration, src_bytes, dst_bytes, count):
+        if self.coef is not None:
+            raise ValueError("Trained classifier uses all features, call predict_batch() instead")
+        score = (self.weight_duration * duration + 
+                self.weight_src_bytes * src_bytes +
+                self.weight_dst_bytes * dst_bytes +
+                self.weight_count * count)
+        
+        if score > self.threshold:
+            return "attack"
+        else:
+            return "normal"
+    
+    def weight_vector(self):
+        if self.coef is not None:
+            return self.coef
+        return np.array([self.weight_duration, self.weight_src_bytes,
+                         self.weight_dst_bytes, self.weight_count], dtype=np.float64)
+    
+    def encode(self, data):
+        # Matrices already produced by the shared FeatureEncoder pass straight through
+        if isinstance(data, np.ndarray) and data.ndim == 2:
+            return data
+        if self.encoder is None:
+            self.encoder = FeatureEncoder(list(data.keys()))
+        if not self.encoder.is_fitted():
+            self.encoder.fit([data])
+        return self.encoder.transform(data)
+    
+    def fit_scaler(self, frames, weights=None):
+        # One pass over frames (or encoded matrices): mean/std of every encoded feature.
+        # weights, if given, holds one array of row multiplicities per frame.
+        count = 0
+        sums = None
+        squares = None
+        for i, frame in enumerate(frames):
+            matrix = self.encode(frame)
+            if sums is None:
+                sums = np.zeros(matrix.shape[1])
+                squares = np.zeros(matrix.shape[1])
+            if weights is None:
+                sums += matrix.sum(axis=0, dtype=np.float64)
+                squares += np.einsum('ij,ij->j', matrix, matrix, dtype=np.float64)
+                count += len(matrix)
+            else:
+                w = np.asarray(weights[i], dtype=np.float64)
+                sums += w @ matrix
+                squares += np.einsum('i,ij,ij->j', w, matrix, matrix, dtype=np.float64)
+                count += w.sum()
+        if not count:
+            raise ValueError("Cannot fit the scaler on empty data")
+        
+        self.mean = sums / count
+        self.scale = np.sqrt(np.maximum(squares / count - self.mean ** 2, 0.0))
+        self.scale[self.scale == 0] = 1.0
+        if self.encoder is not None and self.encoder.is_fitted():
+            self.feature_columns = self.encoder.output_columns()
+        self.coef = None
+        self.bias = 0.0
+    
+    def score_batch(self, data):
+        # Accepts a DataFrame (or any column mapping) or an encoded feature matrix
+        if self.coef is not None:
+            # Standardization is folded into the weights so the matrix is never copied
+            weights = self.coef / self.scale
+            offset = -float(self.mean @ weights)
+            return (self.encode(data) @ weights.astype(np.float32)).astype(np.float64) + offset
+        if isinstance(data, np.ndarray) and data.ndim == 2:
+            features = data.astype(np.float64, copy=False)
+        else:
+            features = np.column_stack(
+                [np.asarray(data[column], dtype=np.float64) for column in self.feature_columns])
+        return features @ self.weight_vector()
+    
+    def predict_batch(self, data):
+        scores = self.score_batch(data)
+        labels = np.where(scores > self.threshold, "attack", "normal")
+        return labels, scores
+    
+    def partial_fit(self, X, y, epochs=1, batch_size=256, lr=0.1, weights=None):
+        # Mini-batch gradient descent on the logistic loss; the scaler is computed once.
+        # With weights (row multiplicities) each epoch shuffles the distinct rows and every batch
+        # takes the weighted mean gradient, so an epoch costs the distinct rows, not the records.
+        # That is the same expected gradient as the undeduplicated data but fewer, larger steps,
+        # so the trained model is close to, not identical with, training on every record.
+        matrix = self.encode(X)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+        if self.mean is None:
+            self.fit_scaler([matrix], None if weights is None else [weights])
+        target = binary_target(y)
+        if self.coef is None:
+            self.coef = np.zeros(matrix.shape[1])
+            self.bias = 0.0
+        
+        n = len(matrix)
+        for epoch in range(epochs):
+            order = self.rng.permutation(n)
+            for start in range(0, n, batch_size):
+                batch = order[start:start + batch_size]
+                features = (matrix[batch] - self.mean) / self.scale
+                logits = np.clip(features @ self.coef + self.bias, -30.0, 30.0)
+                error = 1.0 / (1.0 + np.exp(-logits)) - target[batch]
+                if weights is None:
+                    self.coef -= lr * (features.T @ error) / len(batch)
+                    self.bias -= lr * error.mean()
+                else:
+                    batch_weights = weights[batch]
+                    total = batch_weights.sum()
+                    if total <= 0:
+                        continue
+                    self.coef -= lr * (features.T @ (error * batch_weights)) / total
+                    self.bias -= lr * (error @ batch_weights) / total
+        
+        # Score > threshold is the same decision as sigmoid(score + bias) > 0.5
+        self.threshold = -self.bias
+        return self
+    
+    def sweep_thresholds(self, data, y, max_fpr=None, weights=None):
+        # Scores every row once; see threshold_sweep() for the curves it returns
+        return threshold_sweep(self.score_batch(data), y, max_fpr=max_fpr, weights=weights)
+    
+    def fit(self, X, y, epochs=5, batch_size=256, lr=0.1, weights=None):
+        matrix = self.encode(X)
+        self.fit_scaler([matrix], None if weights is None else [weights])
+        return self.partial_fit(matrix, y, epochs=epochs, batch_size=batch_size, lr=lr, weights=weights)
+    
+    def to_dict(self, feature_names=None):
+        # Plain lists and floats: JSON round-trips float64 values exactly
+        def as_list(values):
+            return None if values is None else [float(value) for value in values]
+        if feature_names is None:
+            feature_names = self.feature_names
+        if feature_names is None and self.encoder is not None:
+            feature_names = self.encoder.feature_names
+        return {
+            'format': LINEAR_MODEL_FORMAT,
+            'version': MODEL_VERSION,
+            'feature_names': list(feature_names) if feature_names is not None else None,
+            'hand_weights': [float(value) for value in (self.weight_duration, self.weight_src_bytes,
+                                                        self.weight_dst_bytes, self.weight_count)],
+            'threshold': float(self.threshold),
+            'feature_columns': list(self.feature_columns),
+            'mean': as_list(self.mean),
+            'scale': as_list(self.scale),
+            'coef': as_list(self.coef),
+            'bias': float(self.bias),
+            'encoder': self.encoder.to_dict() if self.encoder is not None else None,
+        }
+    
+    @classmethod
+    def from_dict(cls, state):
+        if state.get('format') != LINEAR_MODEL_FORMAT or state.get('version') != MODEL_VERSION:
+            raise ValueError(f"unsupported model file: {state.get('format')} version {state.get('version')}")
+        def as_array(values):
+            return None if values is None else np.array(values, dtype=np.float64)
+        encoder = FeatureEncoder.from_dict(state['encoder']) if state['encoder'] is not None else None
+        classifier = cls(encoder)
+        (classifier.weight_duration, classifier.weight_src_bytes,
+         classifier.weight_dst_bytes, classifier.weight_count) = state['hand_weights']
+        classifier.threshold = state['threshold']
+        classifier.feature_columns = state['feature_columns']
+        classifier.mean = as_array(state['mean'])
+        classifier.scale = as_array(state['scale'])
+        classifier.coef = as_array(state['coef'])
+        classifier.bias = state['bias']
+        classifier.feature_names = state['feature_names']
+        return classifier
+    
+    def save(self, path, feature_names=None):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(feature_names), file, separators=(',', ':'))
+        return path
+    
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+    
+    def update_weights(self, new_duration_w, new_src_w, new_dst_w, new_count_w, new_threshold):
+        self.weight_duration = new_duration_w
+        self.weight_src_bytes = new_src_w
+        self.weight_dst_bytes = new_dst_w
+        self.weight_count = new_count_w
+        self.threshold = new_threshold
+        # Hand-picked weights replace any learned model
+        self.feature_columns = ['duration', 'src_bytes', 'dst_bytes', 'count']
+        self.mean = None
+        self.scale = None
+        self.coef = None
+        self.bias = 0.0
+        
+        print("Updated parameters:")
+        print(f"  duration weight: {self.weight_duration}")
+        print(f"  src_bytes weight: {self.weight_src_bytes}")
+        print(f"  dst_bytes weight: {self.weight_dst_bytes}")
+        print(f"  count weight: {self.weight_count}")
+        print(f"  threshold: {self.threshold}")
+
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30.0, 30.0)))
+
+
+class FeatureBinner:
+    # Pre-bins every column into at most max_bins uint8 buckets, once, before tree training
+    def __init__(self, max_bins=256, sample_rows=200000):
+        self.max_bins = max_bins
+        self.sample_rows = sample_rows
+        self.edges = None
+    
+    def fit(self, matrix, categorical=(), seed=0, weights=None):
+        # Numeric columns get quantile cut points (every distinct value when there are few);
+        # categorical columns keep one bin per code, shifted so unknown values (-1) land in bin 0.
+        # weights are row multiplicities; they weight the quantiles.
+        if len(matrix) > self.sample_rows:
+            rows = np.sort(np.random.default_rng(seed).choice(len(matrix), self.sample_rows, replace=False))
+            matrix = matrix[rows]
+            if weights is not None:
+                weights = np.asarray(weights)[rows]
+        self.edges = []
+        for j in range(matrix.shape[1]):
+            if j in categorical:
+                self.edges.append(None)
+                continue
+            values = matrix[:, j].astype(np.float64)
+            finite = np.isfinite(values)
+            values = values[finite]
+            unique, inverse = np.unique(values, return_inverse=True)
+            if len(unique) <= self.max_bins:
+                edges = unique[:-1]
+            else:
+                # Quantiles as the first distinct value whose cumulative weight reaches each level, so
+                # a weighted row gets the same edges as that many copies of it
+                row_weights = None if weights is None else np.asarray(weights)[finite]
+                cumulative = np.cumsum(np.bincount(inverse.reshape(-1), weights=row_weights, minlength=len(unique)))
+                levels = np.linspace(0, 1, self.max_bins)[1:-1] * cumulative[-1]
+                positions = np.minimum(np.searchsorted(cumulative, levels), len(unique) - 1)
+                edges = np.unique(unique[positions])
+            self.edges.append(edges)
+        return self
+    
+    def transform(self, matrix):
+        # Bin i holds values <= edges[i]; NaN sorts past every edge into the top bin
+        bins = np.zeros((len(matrix), len(self.edges)), dtype=np.uint8)
+        for j in range(len(self.edges)):
+            if self.edges[j] is None:
+                bins[:, j] = np.clip(matrix[:, j] + 1, 0, self.max_bins - 1)
+            else:
+                bins[:, j] = np.searchsorted(self.edges[j], np.ascontiguousarray(matrix[:, j]), side='left')
+        return bins
+    
+    def to_dict(self):
+        return {
+            'max_bins': self.max_bins,
+            'edges': [None if edges is None else [float(value) for value in edges] for edges in self.edges],
+        }
+    
+    @classmethod
+    def from_dict(cls, state):
+        binner = cls(state['max_bins'])
+        binner.edges = [None if edges is None else np.array(edges, dtype=np.float64)
+                        for edges in state['edges']]
+        return binner
+
+
+class HistogramTreeClassifier:
+    # Gradient-boosted trees on the logistic loss. Splits are chosen from per-bin gradient/hessian
+    # histograms (LightGBM-style), so the cost of a split depends on bins, not rows.
+    def __init__(self, encoder=None, n_trees=20, max_depth=4, learning_rate=0.3, min_samples_leaf=20,
+                 l2=1.0, max_bins=256):
+        self.encoder = encoder
+        self.n_trees = n_trees
+        self.max_depth = max_depth
+        self.learning_rate = learning_rate
+        self.min_samples_leaf = min_samples_leaf
+        self.l2 = l2
+        self.binner = FeatureBinner(max_bins)
+        self.base_score = 0.0
+        self.threshold = 0.0
+        # Each tree is a dict of flat node arrays; feature -1 marks a leaf
+        self.trees = []
+        self.compiled = None
+        self.feature_names = None
+    
+    def feature_columns(self):
+        return self.encoder.output_columns()
+    
+    def encode(self, data):
+        if self.encoder is None:
+            self.encoder = FeatureEncoder(list(data.keys()), one_hot=False)
+        if not self.encoder.is_fitted():
+            self.encoder.fit([data])
+        return self.encoder.transform(data)
+    
+    def fit_binner(self, matrix, weights=None):
+        columns = self.feature_columns()
+        categorical = [j for j, name in enumerate(columns) if name in self.encoder.symbolic_columns]
+        self.binner.fit(matrix, categorical, weights=weights)
+        return self
+    
+    def bin(self, data):
+        matrix = data if isinstance(data, np.ndarray) else self.encode(data)
+        return self.binner.transform(matrix)
+    
+    def histograms(self, bins, rows, grad, hess, counts=None):
+        # Gradient, hessian and row-count sums for every (feature, bin) pair of a node.
+        # bins is column-major, so each feature's bins are one contiguous gather.
+        # counts holds row multiplicities when the rows were deduplicated.
+        size = self.binner.max_bins
+        totals = np.zeros((3, bins.shape[1], size))
+        everything = len(rows) == len(bins)
+        grad = grad if everything else grad[rows]
+        hess = hess if everything else hess[rows]
+        if counts is not None and not everything:
+            counts = counts[rows]
+        for j in range(bins.shape[1]):
+            column = bins[:, j] if everything else bins[:, j][rows]
+            totals[0, j] = np.bincount(column, weights=grad, minlength=size)
+            totals[1, j] = np.bincount(column, weights=hess, minlength=size)
+            totals[2, j] = np.bincount(column, weights=counts, minlength=size)
+        return totals
+    
+    def best_split(self, histogram, categorical):
+        grad, hess, count = histogram
+        # Numeric bins are scanned in order; categories are sorted by their leaf value first,
+        # which makes the best subset split a prefix of that order
+        order = np.tile(np.arange(grad.shape[1]), (grad.shape[0], 1))
+        if len(categorical):
+            ratio = np.where(count[categorical] > 0, grad[categorical] / (hess[categorical] + self.l2), np.inf)
+            order[categorical] = np.argsort(ratio, axis=1, kind='stable')
+        left_grad = np.cumsum(np.take_along_axis(grad, order, axis=1), axis=1)
+        left_hess = np.cumsum(np.take_along_axis(hess, order, axis=1), axis=1)
+        left_count = np.cumsum(np.take_along_axis(count, order, axis=1), axis=1)
+        total_grad = left_grad[:, -1:]
+        total_hess = left_hess[:, -1:]
+        total_count = left_count[:, -1:]
+        right_grad = total_grad - left_grad
+        right_hess = total_hess - left_hess
+        gain = (left_grad ** 2 / (left_hess + self.l2) + right_grad ** 2 / (right_hess + self.l2)
+                - total_grad ** 2 / (total_hess + self.l2))
+        valid = (left_count >= self.min_samples_leaf) & (total_count - left_count >= self.min_samples_leaf)
+        gain = np.where(valid, gain, -np.inf)
+        feature, position = np.unravel_index(int(np.argmax(gain)), gain.shape)
+        if not gain[feature, position] > 1e-9:
+            return None
+        mask = np.zeros(grad.shape[1], dtype=bool)
+        mask[order[feature, :position + 1]] = True
+        return int(feature), mask
+    
+    def build_tree(self, bins, grad, hess, categorical, update, counts=None):
+        tree = {'feature': [], 'children': [], 'value': [], 'masks': []}
+        
+        def add_node():
+            tree['feature'].append(-1)
+            tree['children'].append([0, 0])
+            tree['value'].append(0.0)
+            tree['masks'].append(None)
+            return len(tree['feature']) - 1
+        
+        def make_leaf(node, rows, histogram):
+            grad_sum = histogram[0, 0].sum()
+            hess_sum = histogram[1, 0].sum()
+            tree['value'][node] = float(-grad_sum / (hess_sum + self.l2) * self.learning_rate)
+            update[rows] = tree['value'][node]
+        
+        all_rows = np.arange(len(bins))
+        level = [(add_node(), all_rows, self.histograms(bins, all_rows, grad, hess, counts))]
+        for depth in range(self.max_depth + 1):
+            next_level = []
+            for node, rows, histogram in level:
+                split = None if depth == self.max_depth else self.best_split(histogram, categorical)
+                if split is None:
+                    make_leaf(node, rows, histogram)
+                    continue
+                feature, mask = split
+                goes_left = mask[bins[rows, feature]]
+                left_rows, right_rows = rows[goes_left], rows[~goes_left]
+                # Histogram the smaller child; the larger one is the parent minus its sibling
+                if len(left_rows) <= len(right_rows):
+                    left_histogram = self.histograms(bins, left_rows, grad, hess, counts)
+                    right_histogram = histogram - left_histogram
+                else:
+                    right_histogram = self.histograms(bins, right_rows, grad, hess, counts)
+                    left_histogram = histogram - right_histogram
+                left, right = add_node(), add_node()
+                tree['feature'][node] = feature
+                tree['masks'][node] = mask
+                tree['children'][node] = [left, right]
+                next_level.extend([(left, left_rows, left_histogram), (right, right_rows, right_histogram)])
+            level = next_level
+        return self.pack_tree(tree)
+    
+    def pack_tree(self, tree):
+        # Flat arrays so prediction walks every row down the tree at once
+        masks = np.zeros((len(tree['feature']), self.binner.max_bins), dtype=bool)
+        for node, mask in enumerate(tree['masks']):
+            if mask is not None:
+                masks[node] = mask
+        return {
+            'feature': np.array(tree['feature'], dtype=np.int32),
+            'children': np.array(tree['children'], dtype=np.int32),
+            'value': np.array(tree['value'], dtype=np.float64),
+            'masks': masks,
+        }
+    
+    def fit_binned(self, bins, y, weights=None):
+        # weights are row multiplicities: a row of weight w trains exactly like w copies of it
+        target = binary_target(y)
+        bins = np.asfortranarray(bins)
+        columns = self.feature_columns()
+        categorical = np.array([j for j, name in enumerate(columns) if name in self.encoder.symbolic_columns],
+                               dtype=np.int64)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+        rate = np.clip(np.average(target, weights=weights), 1e-6, 1 - 1e-6)
+        self.base_score = float(np.log(rate / (1 - rate)))
+        scores = np.full(len(bins), self.base_score)
+        update = np.zeros(len(bins))
+        self.trees = []
+        self.compiled = None
+        for _ in range(self.n_trees):
+            probability = sigmoid(scores)
+            grad = probability - target
+            hess = np.maximum(probability * (1 - probability), 1e-12)
+            if weights is not None:
+                grad *= weights
+                hess *= weights
+            self.trees.append(self.build_tree(bins, grad, hess, categorical, update, weights))
+            # Leaf values were written per row while building, so no re-traversal is needed
+            scores += update
+        return self
+    
+    def fit(self, X, y, weights=None):
+        matrix = self.encode(X)
+        self.fit_binner(matrix, weights)
+        return self.fit_binned(self.bin(matrix), y, weights)
+    
+    def compile(self):
+        # Every distinct split in the forest becomes one test on a raw column: a "<=" against the
+        # bin edge for numeric columns, a lookup table over category codes for symbolic ones
+        tests = {}
+        compiled_trees = []
+        for tree in self.trees:
+            nodes = []
+            for node, feature in enumerate(tree['feature']):
+                if feature < 0:
+                    nodes.append(None)
+                    continue
+                mask = tree['masks'][node]
+                edges = self.binner.edges[feature]
+                if edges is None:
+                    key = (int(feature), 'in', mask.tobytes())
+                else:
+                    key = (int(feature), '<=', float(edges[np.flatnonzero(mask).max()]))
+                tests.setdefault(key, (len(tests), mask))
+                nodes.append(tests[key][0])
+            compiled_trees.append((nodes, tree['children'], tree['value']))
+        self.compiled = (sorted(tests.items(), key=lambda item: item[1][0]), compiled_trees)
+        return self.compiled
+    
+    def column(self, data, feature):
+        if isinstance(data, np.ndarray):
+            return data[:, feature]
+        name = self.feature_columns()[feature]
+        if name in self.encoder.symbolic_columns:
+            return self.encoder.codes(data, name)
+        return column_values(data, name)
+    
+    def score_batch(self, data):
+        # Accepts a DataFrame (or any column mapping) or a FeatureEncoder matrix; nothing is binned
+        tests, trees = self.compiled if self.compiled is not None else self.compile()
+        columns = {}
+        results = []
+        for (feature, kind, value), (index, mask) in tests:
+            if feature not in columns:
+                values = self.column(data, feature)
+                if self.binner.edges[feature] is None:
+                    columns[feature] = np.clip(values.astype(np.int64) + 1, 0, self.binner.max_bins - 1)
+                else:
+                    # Edges come from float32 features, so compare in float32 too
+                    columns[feature] = values.astype(np.float32, copy=False)
+            if kind == 'in':
+                results.append(mask[columns[feature]])
+            else:
+                results.append(columns[feature] <= np.float32(value))
+        
+        def leaf_of(nodes, children, node, dtype):
+            # Each tree is a nest of branch-free selects over the shared test results: with
+            # random-looking tests np.where stalls on branch mispredictions, integer math does not
+            if nodes[node] is None:
+                return dtype(node)
+            left = leaf_of(nodes, children, children[node][0], dtype)
+            right = leaf_of(nodes, children, children[node][1], dtype)
+            test = results[nodes[node]]
+            test = test.view(np.uint8) if dtype is np.uint8 else test.astype(dtype)
+            if np.ndim(left) == 0 and np.ndim(right) == 0:
+                return right + test * dtype((int(left) - int(right)) % (np.iinfo(dtype).max + 1))
+            return right + test * np.subtract(left, right, dtype=dtype)
+        
+        scores = np.full(len(self.column(data, 0)), self.base_score)
+        for nodes, children, values in trees:
+            dtype = np.uint8 if len(nodes) <= 256 else np.uint16
+            scores += values[leaf_of(nodes, children, 0, dtype)]
+        return scores
+    
+    def predict_batch(self, data):
+        scores = self.score_batch(data)
+        labels = np.where(scores > self.threshold, "attack", "normal")
+        return labels, scores
+    
+    def sweep_thresholds(self, data, y, max_fpr=None, weights=None):
+        return threshold_sweep(self.score_batch(data), y, max_fpr=max_fpr, weights=weights)
+    
+    def describe_split(self, feature, mask):
+        name = self.feature_columns()[feature]
+        left_bins = np.flatnonzero(mask)
+        edges = self.binner.edges[feature]
+        if edges is None:
+            vocabulary = self.encoder.vocabularies[name]
+            values = [vocabulary[b - 1] for b in left_bins if 0 < b <= len(vocabulary)]
+            shown = ", ".join(values[:4]) + (", ..." if len(values) > 4 else "")
+            return f"{name} in {{{shown}}}"
+        top = int(left_bins.max())
+        return f"{name} <= {edges[top]:g}" if top < len(edges) else f"{name} is any value"
+    
+    def describe(self, tree_index=0):
+        # The tree as nested if/else rules, in the spirit of step5's hand-written cascade
+        tree = self.trees[tree_index]
+        lines = []
+        
+        def walk(node, indent):
+            if tree['feature'][node] < 0:
+                lines.append(f"{indent}-> {tree['value'][node]:+.3f}")
+                return
+            left, right = tree['children'][node]
+            lines.append(f"{indent}if {self.describe_split(tree['feature'][node], tree['masks'][node])}:")
+            walk(left, indent + "    ")
+            lines.append(f"{indent}else:")
+            walk(right, indent + "    ")
+        
+        walk(0, "")
+        return lines
+    
+    def to_dict(self, feature_names=None):
+        if feature_names is None:
+            feature_names = self.feature_names
+        if feature_names is None and self.encoder is not None:
+            feature_names = self.encoder.feature_names
+        return {
+            'format': TREE_MODEL_FORMAT,
+            'version': MODEL_VERSION,
+            'feature_names': list(feature_names) if feature_names is not None else None,
+            'params': {'n_trees': self.n_trees, 'max_depth': self.max_depth,
+                       'learning_rate': self.learning_rate, 'min_samples_leaf': self.min_samples_leaf,
+                       'l2': self.l2},
+            'base_score': self.base_score,
+            'threshold': float(self.threshold),
+            'encoder': self.encoder.to_dict(),
+            'binner': self.binner.to_dict(),
+            # Masks are stored as the list of bins that go left
+            'trees': [{'feature': tree['feature'].tolist(), 'children': tree['children'].tolist(),
+                       'value': tree['value'].tolist(),
+                       'left_bins': [np.flatnonzero(mask).tolist() for mask in tree['masks']]}
+                      for tree in self.trees],
+        }
+    
+    @classmethod
+    def from_dict(cls, state):
+        if state.get('format') != TREE_MODEL_FORMAT or state.get('version') != MODEL_VERSION:
+            raise ValueError(f"unsupported model file: {state.get('format')} version {state.get('version')}")
+        classifier = cls(FeatureEncoder.from_dict(state['encoder']), max_bins=state['binner']['max_bins'],
+                         **state['params'])
+        classifier.binner = FeatureBinner.from_dict(state['binner'])
+        classifier.base_score = state['base_score']
+        classifier.threshold = state['threshold']
+        classifier.feature_names = state['feature_names']
+        for tree in state['trees']:
+            masks = np.zeros((len(tree['feature']), classifier.binner.max_bins), dtype=bool)
+            for node, left_bins in enumerate(tree['left_bins']):
+                masks[node, left_bins] = True
+            classifier.trees.append({
+                'feature': np.array(tree['feature'], dtype=np.int32),
+                'children': np.array(tree['children'], dtype=np.int32).reshape(-1, 2),
+                'value': np.array(tree['value'], dtype=np.float64),
+                'masks': masks,
+            })
+        return classifier
+    
+    def save(self, path, feature_names=None):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(feature_names), file, separators=(',', ':'))
+        return path
+    
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+
+def load_model(path):
+    # Picks the model class from the file's format field
+    with open(path) as file:
+        state = json.load(file)
+    classes = {LINEAR_MODEL_FORMAT: SimpleLinearClassifier, TREE_MODEL_FORMAT: HistogramTreeClassifier}
+    if state.get('format') not in classes:
+        raise ValueError(f"unsupported model file: {state.get('format')}")
+    return classes[state['format']].from_dict(state)
@@ -0,0 +1,248 @@
+import hashlib
+
+import numpy as np
+
+
+def column_values(data, column):
+    values = data[column]
+    return values.to_numpy() if hasattr(values, 'to_numpy') else np.asarray(values)
+
+
+def value_counts(values, weights=None):
+    # (value, count) pairs for one chunk; with weights every row counts as its multiplicity
+    if weights is None:
+        if hasattr(values, 'value_counts'):
+            return values.value_counts(sort=False).items()
+        return zip(*np.unique(np.asarray(values, dtype=object), return_counts=True))
+    if hasattr(values, 'cat'):
+        labels = values.cat.categories
+        codes = values.cat.codes.to_numpy()
+        # Missing values (code -1) are left out, like value_counts() does
+        known = codes >= 0
+        counts = np.bincount(codes[known], weights=weights[known], minlength=len(labels))
+    else:
+        labels, codes = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+        counts = np.bincount(codes.reshape(-1), weights=weights, minlength=len(labels))
+    return zip(labels, counts.astype(np.int64))
+
+
+class RunningMoments:
+    # Welford-style mean/variance for several columns, merged with Chan's parallel formula
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.count = 0
+        self.mean = np.zeros(len(self.columns))
+        self.m2 = np.zeros(len(self.columns))
+
+    def combine(self, count, mean, m2):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.count * count / total)
+        self.count = total
+
+    def update(self, data, weights=None):
+        if len(data) == 0:
+            return
+        values = np.column_stack([column_values(data, column).astype(np.float64) for column in self.columns])
+        if weights is None:
+            mean = values.mean(axis=0)
+            self.combine(len(values), mean, ((values - mean) ** 2).sum(axis=0))
+            return
+        # A row with weight w contributes exactly what w copies of it would
+        weights = np.asarray(weights, dtype=np.float64)
+        mean = weights @ values / weights.sum()
+        self.combine(int(weights.sum()), mean, weights @ (values - mean) ** 2)
+
+    def merge(self, other):
+        self.combine(other.count, other.mean, other.m2)
+
+    def variance(self):
+        if self.count < 2:
+            return np.zeros(len(self.columns))
+        return self.m2 / (self.count - 1)
+
+    def summary(self):
+        std = np.sqrt(self.variance())
+        return {column: {'mean': float(self.mean[i]), 'std': float(std[i])}
+                for i, column in enumerate(self.columns)}
+
+
+class QuantileDigest:
+    # A merging t-digest: sorted weighted centroids, compressed with the k1 scale function.
+    # Each centroid also keeps its min/max, so a centroid holding one repeated value stays exact.
+    # Up to exact_values distinct values are kept uncompressed, one centroid each; quantiles are
+    # then exact and do not depend on how the data was chunked or merged.
+    def __init__(self, compression=200, exact_values=65536):
+        self.compression = compression
+        self.exact_values = exact_values
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.lows = np.zeros(0)
+        self.highs = np.zeros(0)
+
+    def scale(self, q):
+        return self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+
+    def inverse_scale(self, k):
+        return (np.sin(np.clip(2 * np.pi * k / self.compression, -np.pi / 2, np.pi / 2)) + 1) / 2
+
+    def compress(self, means, weights, lows, highs):
+        order = np.argsort(means, kind='stable')
+        means, weights, lows, highs = means[order], weights[order], lows[order], highs[order]
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        # Greedy merge from the left: a centroid starting at quantile q_lo takes its neighbours while
+        # k(q_hi) - k(q_lo) <= 1. One searchsorted per output centroid finds how far that reaches.
+        starts = []
+        i = 0
+        while i < len(means):
+            starts.append(i)
+            q_lo = (cumulative[i] - weights[i]) / total
+            limit = self.inverse_scale(self.scale(q_lo) + 1) * total
+            i = max(int(np.searchsorted(cumulative, limit * (1 + 1e-12), side='right')), i + 1)
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        self.lows = np.minimum.reduceat(lows, starts)
+        self.highs = np.maximum.reduceat(highs, starts)
+
+    def add_centroids(self, means, weights, lows, highs):
+        if len(means) == 0:
+            return
+        means, weights = np.concatenate([self.means, means]), np.concatenate([self.weights, weights])
+        lows, highs = np.concatenate([self.lows, lows]), np.concatenate([self.highs, highs])
+        if np.array_equal(lows, highs):
+            # Still one centroid per distinct value: add up the weights of equal values
+            unique, inverse = np.unique(means, return_inverse=True)
+            means = lows = highs = unique
+            weights = np.bincount(inverse.reshape(-1), weights=weights, minlength=len(unique))
+            if len(unique) <= self.exact_values:
+                self.means, self.weights, self.lows, self.highs = means, weights, lows, highs
+                return
+        self.compress(means, weights, lows, highs)
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        # Counter columns repeat heavily, so collapse duplicates before compressing
+        if weights is None:
+            unique, counts = np.unique(values, return_counts=True)
+            counts = counts.astype(np.float64)
+        else:
+            unique, inverse = np.unique(values, return_inverse=True)
+            counts = np.bincount(inverse.reshape(-1), weights=weights, minlength=len(unique))
+        self.add_centroids(unique, counts, unique, unique)
+
+    def merge(self, other):
+        self.add_centroids(other.means, other.weights, other.lows, other.highs)
+
+    def quantile(self, q):
+        if len(self.means) == 0:
+            return None
+        # Interpolates between neighbouring centroid means placed at their rank midpoints, from the
+        # minimum at rank 0 to the maximum at the total. A centroid of one repeated value covers its
+        # whole rank range, so ranks inside it return that value exactly.
+        cumulative = np.cumsum(self.weights)
+        target = q * cumulative[-1]
+        single = self.lows == self.highs
+        i = min(int(np.searchsorted(cumulative, target, side='left')), len(cumulative) - 1)
+        if single[i]:
+            return float(self.lows[i])
+        ranks = np.column_stack([np.where(single, cumulative - self.weights, cumulative - self.weights / 2),
+                                 np.where(single, cumulative, cumulative - self.weights / 2)]).reshape(-1)
+        values = np.repeat(self.means, 2)
+        ranks = np.concatenate([[0], ranks, [cumulative[-1]]])
+        values = np.concatenate([[self.lows[0]], values, [self.highs[-1]]])
+        return float(np.interp(target, ranks, values))
+
+
+class HyperLogLog:
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def hash_value(self, value):
+        # A stable hash: Python's hash() is salted per process and would break merging
+        return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+    def add(self, value):
+        hashed = self.hash_value(value)
+        index = hashed >> (64 - self.precision)
+        remainder = (hashed << self.precision) & ((1 << 64) - 1)
+        rank = 64 - self.precision + 1 if remainder == 0 else 65 - remainder.bit_length()
+        rank = min(rank, 64 - self.precision + 1)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        # Adding a value twice changes nothing, so only distinct values per chunk are hashed
+        for value in np.unique(np.asarray(values, dtype=object).astype(str)):
+            self.add(value)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return m * np.log(m / zeros)
+        return float(raw)
+
+
+class DatasetStatistics:
+    def __init__(self, count_columns, moment_columns, quantile_columns, distinct_columns, compression=200):
+        self.rows = 0
+        self.counts = {column: {} for column in count_columns}
+        self.moments = RunningMoments(moment_columns)
+        self.quantiles = {column: QuantileDigest(compression) for column in quantile_columns}
+        self.distinct = {column: HyperLogLog() for column in distinct_columns}
+
+    def update(self, data, weights=None):
+        # weights: optional per-row multiplicities of deduplicated records
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+        self.rows += len(data) if weights is None else int(weights.sum())
+        for column, counts in self.counts.items():
+            for value, count in value_counts(data[column], weights):
+                if count:
+                    counts[str(value)] = counts.get(str(value), 0) + int(count)
+        self.moments.update(data, weights)
+        for column, digest in self.quantiles.items():
+            digest.update(column_values(data, column), weights)
+        for column, sketch in self.distinct.items():
+            sketch.update(column_values(data, column))
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        for column, counts in other.counts.items():
+            merged = self.counts.setdefault(column, {})
+            for value, count in counts.items():
+                merged[value] = merged.get(value, 0) + count
+        self.moments.merge(other.moments)
+        for column, digest in other.quantiles.items():
+            self.quantiles[column].merge(digest)
+        for column, sketch in other.distinct.items():
+            self.distinct[column].merge(sketch)
+        return self
+
+    def sorted_counts(self, column):
+        # Most frequent first, ties broken by label
+        return sorted(self.counts[column].items(), key=lambda item: (-item[1], item[0]))
+
+    def summary(self, quantiles=(0.5, 0.9, 0.99)):
+        return {
+            'rows': self.rows,
+            'counts': {column: dict(self.sorted_counts(column)) for column in self.counts},
+            'moments': self.moments.summary(),
+            'quantiles': {column: {str(q): digest.quantile(q) for q in quantiles}
+                          for column, digest in self.quantiles.items()},
+            'distinct': {column: round(sketch.estimate()) for column, sketch in self.distinct.items()},
+        }
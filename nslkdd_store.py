@@ -0,0 +1,189 @@
+import contextlib
+import fcntl
+import json
+import os
+
+import numpy as np
+
+STORE_VERSION = 1
+# Categorical columns are stored as codes into an append-only list of categories
+CODE_DTYPE = np.dtype(np.int16)
+
+
+class RecordStore:
+    # A fixed-schema, append-only column store: one raw binary file per column plus store.json,
+    # which holds the schema, the category lists and the number of committed rows. Appends write
+    # the column files first and then replace store.json, so readers (which memory-map exactly
+    # the committed rows) never see a half-written batch. Writers take an exclusive lock on
+    # store.lock and re-read store.json under it, so concurrent appends queue up instead of
+    # overwriting each other's rows.
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta = None
+
+    @staticmethod
+    def is_store(path):
+        return os.path.isfile(os.path.join(path, 'store.json'))
+
+    @classmethod
+    def create(cls, directory, schema):
+        # schema maps column name to 'category' or a NumPy dtype name, in record order
+        os.makedirs(directory, exist_ok=True)
+        store = cls(directory)
+        with store.locked():
+            if cls.is_store(directory):
+                raise ValueError(f"record store already exists: {directory}")
+            store.meta = {
+                'version': STORE_VERSION,
+                'rows': 0,
+                'columns': {name: {'kind': 'category', 'dtype': CODE_DTYPE.name, 'categories': []}
+                            if kind == 'category' else {'kind': 'numeric', 'dtype': np.dtype(kind).name}
+                            for name, kind in schema.items()},
+            }
+            for name in store.meta['columns']:
+                open(store.column_path(name), 'wb').close()
+            store.commit()
+        return store
+
+    @classmethod
+    def open(cls, directory, schema=None):
+        # With a schema, a missing store is created
+        if not cls.is_store(directory):
+            if schema is None:
+                raise FileNotFoundError(f"no record store at: {directory}")
+            try:
+                return cls.create(directory, schema)
+            except ValueError:
+                # Another writer created it first
+                pass
+        store = cls(directory)
+        store.refresh()
+        if schema is not None and list(schema) != list(store.meta['columns']):
+            raise ValueError(f"record store {directory} has columns {list(store.meta['columns'])}")
+        return store
+
+    def refresh(self):
+        # Picks up rows other processes committed since this store was opened
+        with open(os.path.join(self.directory, 'store.json')) as file:
+            meta = json.load(file)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"unsupported record store version: {meta.get('version')}")
+        self.meta = meta
+        return self
+
+    @contextlib.contextmanager
+    def locked(self):
+        # Held for the whole refresh, trim, write and commit sequence of one append
+        with open(os.path.join(self.directory, 'store.lock'), 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield self
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def commit(self):
+        path = os.path.join(self.directory, 'store.json')
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.meta, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + '.tmp', path)
+
+    def column_path(self, name):
+        return os.path.join(self.directory, name + '.bin')
+
+    @property
+    def rows(self):
+        return self.meta['rows']
+
+    @property
+    def columns(self):
+        return list(self.meta['columns'])
+
+    def dtype(self, name):
+        return np.dtype(self.meta['columns'][name]['dtype'])
+
+    def is_categorical(self, name):
+        return self.meta['columns'][name]['kind'] == 'category'
+
+    def categories(self, name):
+        return self.meta['columns'][name]['categories']
+
+    def column(self, name, start=0, stop=None):
+        # Zero-copy view of committed rows [start, stop); codes for categorical columns
+        stop = self.rows if stop is None else min(stop, self.rows)
+        dtype = self.dtype(name)
+        if stop <= start:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.column_path(name), dtype=dtype, mode='r', offset=start * dtype.itemsize,
+                         shape=(stop - start,))
+
+    def encode_categories(self, name, values):
+        # Codes into the store's category list; new categories are appended, so codes never change
+        categories = self.categories(name)
+        index = {category: i for i, category in enumerate(categories)}
+        if hasattr(values, 'cat'):
+            labels = [str(value) for value in values.cat.categories]
+            raw = values.cat.codes.to_numpy()
+        else:
+            unique, raw = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+            labels = list(unique)
+            raw = raw.reshape(-1)
+        for label in labels:
+            if label not in index:
+                index[label] = len(categories)
+                categories.append(label)
+        if len(categories) > np.iinfo(CODE_DTYPE).max:
+            raise ValueError(f"too many categories for column {name}")
+        # Missing values (code -1) stay -1 through the trailing lookup entry
+        lookup = np.array([index[label] for label in labels] + [-1], dtype=CODE_DTYPE)
+        return lookup[raw]
+
+    def convert(self, name, values):
+        dtype = self.dtype(name)
+        values = np.asarray(values.to_numpy() if hasattr(values, 'to_numpy') else values)
+        if dtype.kind in 'iu' and len(values):
+            if values.dtype.kind == 'f' and not np.isfinite(values).all():
+                raise ValueError(f"column {name} has missing values, stored as {dtype.name}")
+            info = np.iinfo(dtype)
+            if values.min() < info.min or values.max() > info.max:
+                raise ValueError(f"column {name} has values outside the {dtype.name} range")
+        return np.ascontiguousarray(values, dtype=dtype)
+
+    def append(self, data):
+        # data maps every store column to equally long values (a DataFrame works);
+        # extra columns are ignored. Returns the number of rows appended.
+        names = self.columns
+        missing = [name for name in names if name not in data]
+        if missing:
+            raise ValueError(f"records lack store columns: {missing}")
+        rows = len(data[names[0]])
+        with self.locked():
+            # Another writer may have appended rows and categories since this store was read
+            self.refresh()
+            converted = {}
+            # Numeric columns are checked first, so a rejected batch leaves the category lists alone
+            for name in sorted(names, key=self.is_categorical):
+                values = data[name]
+                if len(values) != rows:
+                    raise ValueError(f"column {name} has {len(values)} values, expected {rows}")
+                if self.is_categorical(name):
+                    converted[name] = self.encode_categories(name, values)
+                else:
+                    converted[name] = self.convert(name, values)
+            if not rows:
+                return 0
+            for name in names:
+                with open(self.column_path(name), 'r+b') as file:
+                    # Bytes past the committed rows are left over from an interrupted append
+                    file.truncate(self.rows * self.dtype(name).itemsize)
+                    file.seek(0, os.SEEK_END)
+                    file.write(memoryview(converted[name]))
+                    file.flush()
+                    os.fsync(file.fileno())
+            self.meta['rows'] += rows
+            self.commit()
+        return rows
+
+    def nbytes(self):
+        return sum(self.rows * self.dtype(name).itemsize for name in self.columns)
@@ -1,13 +1,54 @@
-import pandas as pd
+import argparse
 import csv
+import sys
+from array import array
 
 class SimpleNSLKDDProcessor:
     def __init__(self):
         self.csv_filename = None
         self.data = None
-        
+        # Typed columns parsed once from csv_filename and shared by all steps
+        self.symbolic_columns = {"protocol_type", "service", "flag", "attack_type"}
+        self.headers = None
+        self.columns = None
+        self.num_rows = 0
+        
+    def load_typed_columns(self):
+        if self.columns is not None:
+            return self.columns
+        
+        # Single pass: numbers go into 64-bit array columns, symbols are interned strings
+        with open(self.csv_filename, 'r', newline='') as file:
+            reader = csv.reader(file)
+            headers = next(reader)
+            columns = []
+            for header in headers:
+                if header in self.symbolic_columns:
+                    columns.append([])
+                else:
+                    columns.append(array('q'))
+            intern = sys.intern
+            num_rows = 0
+            for row in reader:
+                for i, value in enumerate(row):
+                    column = columns[i]
+                    if type(column) is list:
+                        column.append(intern(value))
+                    else:
+                        column.append(int(value))
+                num_rows += 1
+        
+        self.headers = headers
+        self.columns = dict(zip(headers, columns))
+        self.num_rows = num_rows
+        return self.columns
+    
+    def typed_row(self, index):
+        return [self.columns[header][index] for header in self.headers]
+    
     def step1_create_toy_csv(self, filename="toy.csv"):
         self.csv_filename = filename
+        self.columns = None
         
         sample_data = [
             [0, "tcp", "http", "SF", 239, 486, 0, "normal"],
@@ -40,10 +81,11 @@ class SimpleNSLKDDProcessor:
         print("Reading CSV file:", self.csv_filename)
         print("-" * 50)
         
-        with open(self.csv_filename, 'r') as file:
-            reader = csv.reader(file)
-            for line_num, line in enumerate(reader, 1):
-                print("Line", line_num, ":", line)
+        self.load_typed_columns()
+        print("Line", 1, ":", self.headers)
+        for index in range(self.num_rows):
+            line = [str(value) for value in self.typed_row(index)]
+            print("Line", index + 2, ":", line)
         
         print("-" * 50)
         print("File reading complete")
@@ -56,23 +98,20 @@ class SimpleNSLKDDProcessor:
         print("Extracting values from:", self.csv_filename)
         print("-" * 50)
         
-        data_rows = []
-        with open(self.csv_filename, 'r') as file:
-            reader = csv.reader(file)
-            headers = next(reader)
-            
-            print("Headers:", headers)
+        columns = self.load_typed_columns()
+        headers = self.headers
+        
+        print("Headers:", headers)
+        print()
+        
+        for index in range(self.num_rows):
+            print("Row", index + 1, ":")
+            for header in headers:
+                print("  ", header, ":", columns[header][index])
             print()
-            
-            for row_num, row in enumerate(reader, 1):
-                print("Row", row_num, ":")
-                for i, value in enumerate(row):
-                    print("  ", headers[i], ":", value)
-                print()
-                data_rows.append(row)
         
-        self.data = {'headers': headers, 'rows': data_rows}
-        print("Extracted", len(data_rows), "data rows")
+        self.data = {'headers': headers, 'columns': columns, 'num_rows': self.num_rows}
+        print("Extracted", self.num_rows, "data rows")
         return self.data
     
     def step4_simple_prediction_function(self):
@@ -115,11 +154,12 @@ class SimpleNSLKDDProcessor:
         print("-" * 50)
         
         if self.data:
-            for i, row in enumerate(self.data['rows'][:5]):
-                protocol = row[1]
-                src_bytes = int(row[4])
-                dst_bytes = int(row[5])
-                actual = row[7]
+            columns = self.data['columns']
+            for i in range(min(5, self.data['num_rows'])):
+                protocol = columns['protocol_type'][i]
+                src_bytes = columns['src_bytes'][i]
+                dst_bytes = columns['dst_bytes'][i]
+                actual = columns['attack_type'][i]
                 
                 prediction = simple_rule_classifier(protocol, src_bytes, dst_bytes)
                 print("Row", i+1, ":", protocol, ",", src_bytes, ",", dst_bytes)
@@ -160,11 +200,12 @@ class SimpleNSLKDDProcessor:
         classifier = SimpleLinearClassifier()
         
         if self.data:
+            columns = self.data['columns']
             print("Initial predictions:")
-            for i, row in enumerate(self.data['rows'][:3]):
-                src_bytes = int(row[4])
-                dst_bytes = int(row[5])
-                actual = row[7]
+            for i in range(min(3, self.data['num_rows'])):
+                src_bytes = columns['src_bytes'][i]
+                dst_bytes = columns['dst_bytes'][i]
+                actual = columns['attack_type'][i]
                 
                 prediction = classifier.predict(src_bytes, dst_bytes)
                 score = classifier.weight_src_bytes * src_bytes + classifier.weight_dst_bytes * dst_bytes
@@ -179,10 +220,10 @@ class SimpleNSLKDDProcessor:
             
             print()
             print("Predictions after parameter update:")
-            for i, row in enumerate(self.data['rows'][:3]):
-                src_bytes = int(row[4])
-                dst_bytes = int(row[5])
-                actual = row[7]
+            for i in range(min(3, self.data['num_rows'])):
+                src_bytes = columns['src_bytes'][i]
+                dst_bytes = columns['dst_bytes'][i]
+                actual = columns['attack_type'][i]
                 
                 prediction = classifier.predict(src_bytes, dst_bytes)
                 score = classifier.weight_src_bytes * src_bytes + classifier.weight_dst_bytes * dst_bytes
@@ -194,7 +235,7 @@ class SimpleNSLKDDProcessor:
         print("Simple linear classifier with learnable parameters created")
         return classifier
     
-    def run_complete_simple_pipeline(self):
+    def run_complete_simple_pipeline(self, interactive=True):
         print("Starting Simple Step-by-Step Pipeline")
         print("=" * 60)
         
@@ -202,31 +243,36 @@ class SimpleNSLKDDProcessor:
         print("STEP 1: Creating toy CSV file")
         self.step1_create_toy_csv()
         
-        input("Press Enter to continue to Step 2...")
+        if interactive:
+            input("Press Enter to continue to Step 2...")
         
         print()
         print("STEP 2: Reading and printing CSV content")
         self.step2_read_and_print_csv()
         
-        input("Press Enter to continue to Step 3...")
+        if interactive:
+            input("Press Enter to continue to Step 3...")
         
         print()
         print("STEP 3: Extracting individual values")
         self.step3_extract_values()
         
-        input("Press Enter to continue to Step 4...")
+        if interactive:
+            input("Press Enter to continue to Step 4...")
         
         print()
         print("STEP 4: Creating simple prediction functions")
         self.step4_simple_prediction_function()
         
-        input("Press Enter to continue to Step 5...")
+        if interactive:
+            input("Press Enter to continue to Step 5...")
         
         print()
         print("STEP 5: Creating input-based prediction function")
         self.step5_input_based_prediction()
         
-        input("Press Enter to continue to Step 6...")
+        if interactive:
+            input("Press Enter to continue to Step 6...")
         
         print()
         print("STEP 6: Creating simple linear classifier")
@@ -245,11 +291,16 @@ class SimpleNSLKDDProcessor:
         
         return classifier
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simple toy-data pipeline")
+    parser.add_argument('--interactive', action='store_true',
+                        help="pause for Enter between steps")
+    args = parser.parse_args(argv)
+    
     print("Starting with elementary approach...")
     
     processor = SimpleNSLKDDProcessor()
-    classifier = processor.run_complete_simple_pipeline()
+    classifier = processor.run_complete_simple_pipeline(interactive=args.interactive)
     
     return processor, classifier
 
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the top of the repository, next to main.py.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import synthetic_chunk
+from nslkdd_loader import load_pipeline_module
+
+
+@pytest.fixture(scope='session')
+def pipeline():
+    return load_pipeline_module()
+
+
+@pytest.fixture
+def processor(pipeline):
+    processor = pipeline.SimpleNSLKDDProcessor()
+    processor.verbose = False
+    return processor
+
+
+@pytest.fixture
+def load(pipeline):
+    # step1 on a fresh processor, without writing a columnar cache next to the data
+    def load(path, **options):
+        processor = pipeline.SimpleNSLKDDProcessor()
+        processor.verbose = False
+        assert processor.step1_load_real_csv(path, use_cache=False, **options)
+        return processor
+    return load
+
+
+@pytest.fixture(scope='session')
+def capture_csv(pipeline, tmp_path_factory):
+    # Synthetic NSL-KDD rows where most records occur several times, in shuffled order
+    rng = np.random.default_rng(7)
+    distinct = synthetic_chunk(pipeline.SimpleNSLKDDProcessor(), 3000, rng)
+    data = distinct.iloc[rng.integers(0, len(distinct), 12000)]
+    path = tmp_path_factory.mktemp('capture') / 'capture.csv'
+    data.to_csv(path, header=False, index=False)
+    return str(path)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from nslkdd_models import HistogramTreeClassifier, SimpleLinearClassifier, rule_classifier_predict_batch
+
+
+def assert_same_statistics(left, right):
+    left, right = left.summary(), right.summary()
+    for key in ('rows', 'counts', 'quantiles', 'distinct'):
+        assert left[key] == right[key], key
+    for column, moments in left['moments'].items():
+        assert moments['mean'] == pytest.approx(right['moments'][column]['mean'], rel=1e-9)
+        assert moments['std'] == pytest.approx(right['moments'][column]['std'], rel=1e-9)
+
+
+def test_dedup_keeps_every_record_as_a_weight(load, capture_csv):
+    full = load(capture_csv)
+    deduplicated = load(capture_csv, dedup=True)
+    assert len(deduplicated.data) < len(full.data)
+    assert deduplicated.weights.sum() == len(full.data)
+    # The distinct rows rebuild every loaded record in file order
+    rebuilt = deduplicated.data.iloc[deduplicated.record_rows].reset_index(drop=True)
+    assert rebuilt.equals(full.data)
+
+
+def test_dedup_statistics_match(load, capture_csv):
+    full = load(capture_csv)
+    deduplicated = load(capture_csv, dedup=True)
+    assert_same_statistics(full.compute_statistics(), deduplicated.compute_statistics())
+
+
+def test_dedup_confusion_matrices_match(load, capture_csv):
+    full = load(capture_csv)
+    deduplicated = load(capture_csv, dedup=True)
+    assert (full.reduce_confusion(rule_classifier_predict_batch).summary()
+            == deduplicated.reduce_confusion(rule_classifier_predict_batch).summary())
+    
+    trees = [processor.train_tree_classifier(HistogramTreeClassifier()) for processor in (full, deduplicated)]
+    assert (full.reduce_confusion(lambda data: trees[0].predict_batch(data)[0]).summary()
+            == deduplicated.reduce_confusion(lambda data: trees[1].predict_batch(data)[0]).summary())
+
+
+@pytest.mark.parametrize('weight', [3, 0.5])
+def test_uniform_weights_train_like_no_weights(load, capture_csv, weight):
+    processor = load(capture_csv)
+    matrix = processor.encoded_features()
+    labels = processor.encoder.encode_labels(processor.data)
+    plain = SimpleLinearClassifier(processor.encoder).fit(matrix, labels)
+    weighted = SimpleLinearClassifier(processor.encoder).fit(matrix, labels, weights=np.full(len(matrix), weight))
+    assert weighted.coef == pytest.approx(plain.coef, rel=1e-9, abs=1e-12)
+    assert weighted.threshold == pytest.approx(plain.threshold, rel=1e-9)
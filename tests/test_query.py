@@ -0,0 +1,29 @@
+import pytest
+
+
+def test_filtered_stream_finds_matches_past_the_first_file(load, capture_csv, tmp_path):
+    data = load(capture_csv).data
+    first, second = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    data[data['protocol_type'] != 'icmp'].to_csv(first, header=False, index=False)
+    data.to_csv(second, header=False, index=False)
+    filters = {'protocol_type': 'icmp'}
+    in_memory = load([str(first), str(second)], filters=filters)
+    streamed = load([str(first), str(second)], filters=filters, chunksize=1000)
+    assert len(streamed.head(5)) == 5
+    assert streamed.compute_statistics().rows == len(in_memory.data) > 0
+
+
+@pytest.mark.parametrize('chunksize', [None, 1000])
+def test_float32_filter_matches(load, capture_csv, chunksize):
+    data = load(capture_csv).data
+    value = data['serror_rate'].iloc[0]
+    expected = int((data['serror_rate'] == value).sum())
+    filtered = load(capture_csv, filters={'serror_rate': f"{value:.2f}"}, chunksize=chunksize)
+    assert filtered.compute_statistics().rows == expected
+
+
+@pytest.mark.parametrize('chunksize', [None, 1000])
+@pytest.mark.parametrize('filters', [{'land': 'abc'}, {'land': '300'}, {'count': '1.5'}])
+def test_invalid_filter_values_fail_before_loading(processor, capture_csv, chunksize, filters):
+    assert not processor.step1_load_real_csv(capture_csv, use_cache=False, chunksize=chunksize, filters=filters)
+    assert not processor.has_data()
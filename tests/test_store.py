@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nslkdd_store import RecordStore
+
+SCHEMA = {'protocol_type': 'category', 'src_bytes': 'int64', 'land': 'uint8', 'serror_rate': 'float32'}
+
+
+def batch(protocols, src_bytes, land, serror_rate):
+    return pd.DataFrame({
+        'protocol_type': pd.Categorical(protocols),
+        'src_bytes': np.array(src_bytes, dtype=np.int64),
+        'land': np.array(land, dtype=np.int64),
+        'serror_rate': np.array(serror_rate, dtype=np.float32),
+    })
+
+
+def read_back(store):
+    columns = {}
+    for name in store.columns:
+        values = np.asarray(store.column(name))
+        if store.is_categorical(name):
+            values = np.array(store.categories(name), dtype=object)[values]
+        columns[name] = values
+    return columns
+
+
+def file_sizes(store):
+    return {name: os.path.getsize(store.column_path(name)) for name in store.columns}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecordStore.create(str(tmp_path / 'kdd.store'), SCHEMA)
+    store.append(batch(['tcp', 'udp'], [10, 20], [0, 1], [0.0, 0.5]))
+    return store
+
+
+def test_append_after_a_torn_append(store):
+    # An append that died after writing part of its column files and before store.json
+    with open(store.column_path('src_bytes'), 'ab') as file:
+        file.write(np.array([99], dtype=np.int64).tobytes()[:5])
+    with open(store.column_path('protocol_type'), 'ab') as file:
+        file.write(np.array([0, 1, 0], dtype=np.int16).tobytes())
+    
+    reopened = RecordStore.open(store.directory)
+    assert reopened.rows == 2
+    assert read_back(reopened)['src_bytes'].tolist() == [10, 20]
+    
+    reopened.append(batch(['icmp', 'tcp'], [30, 40], [1, 0], [1.0, 0.25]))
+    assert file_sizes(reopened)['src_bytes'] == 4 * 8
+    records = read_back(RecordStore.open(store.directory))
+    assert records['protocol_type'].tolist() == ['tcp', 'udp', 'icmp', 'tcp']
+    assert records['src_bytes'].tolist() == [10, 20, 30, 40]
+    assert records['land'].tolist() == [0, 1, 1, 0]
+    assert records['serror_rate'].tolist() == [0.0, 0.5, 1.0, 0.25]
+
+
+def test_rejected_append_changes_nothing(store):
+    sizes = file_sizes(store)
+    # land does not fit in uint8, and the batch brings a category the store has not seen
+    with pytest.raises(ValueError):
+        store.append(batch(['icmp'], [30], [300], [0.0]))
+    with pytest.raises(ValueError):
+        store.append({'protocol_type': ['icmp']})
+    
+    for reopened in (store, RecordStore.open(store.directory)):
+        assert reopened.rows == 2
+        assert reopened.categories('protocol_type') == ['tcp', 'udp']
+        assert file_sizes(reopened) == sizes
+
+
+def test_two_writers_keep_each_others_rows(store):
+    first = RecordStore.open(store.directory)
+    second = RecordStore.open(store.directory)
+    first.append(batch(['udp', 'udp'], [30, 40], [0, 0], [0.0, 0.0]))
+    # second was opened before those rows and the icmp category existed
+    second.append(batch(['icmp'], [50], [1], [1.0]))
+    
+    records = read_back(RecordStore.open(store.directory))
+    assert records['protocol_type'].tolist() == ['tcp', 'udp', 'udp', 'udp', 'icmp']
+    assert records['src_bytes'].tolist() == [10, 20, 30, 40, 50]
+
+
+def append_batches(directory, protocol, batches):
+    store = RecordStore.open(directory, SCHEMA)
+    for i in range(batches):
+        store.append(batch([protocol], [i], [0], [0.0]))
+
+
+def test_concurrent_processes_append_every_row(tmp_path):
+    directory = str(tmp_path / 'shared.store')
+    context = multiprocessing.get_context('spawn')
+    writers = [context.Process(target=append_batches, args=(directory, protocol, 20))
+               for protocol in ('tcp', 'udp', 'icmp')]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+        assert writer.exitcode == 0
+    
+    records = read_back(RecordStore.open(directory))
+    assert len(records['src_bytes']) == 60
+    for protocol in ('tcp', 'udp', 'icmp'):
+        assert sorted(records['src_bytes'][records['protocol_type'] == protocol]) == list(range(20))
@@ -0,0 +1,20 @@
+from nslkdd_models import rule_classifier_predict_batch
+
+
+def test_chunked_step3_matches_in_memory(load, capture_csv):
+    in_memory = load(capture_csv)
+    streamed = load(capture_csv, chunksize=700)
+    assert streamed.data is None
+    in_memory.step3_extract_values()
+    streamed.step3_extract_values()
+    left, right = in_memory.results['step3'], streamed.results['step3']
+    for key in ('rows', 'counts', 'quantiles', 'distinct'):
+        assert left[key] == right[key], key
+    assert left['rows'] == 12000
+
+
+def test_chunked_rule_evaluation_matches_in_memory(load, capture_csv):
+    in_memory = load(capture_csv)
+    streamed = load(capture_csv, chunksize=700)
+    assert (in_memory.reduce_confusion(rule_classifier_predict_batch).summary()
+            == streamed.reduce_confusion(rule_classifier_predict_batch).summary())